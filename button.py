@@ -1,4 +1,5 @@
 import utime
+from array import array
 from machine import Pin
 
 
@@ -7,7 +8,20 @@ class Button:
     DOUBLECLICK_MS = 400
     HOLD_MS = 1000
 
-    def __init__(self, pin: Pin) -> None:
+    EDGE_BUFFER_SIZE = 16
+    POLL_MS = 10
+
+    def __init__(self, pin: Pin, irq: bool = False, on_edge=None) -> None:
+        """Create a new button.
+
+        By default, the pin is sampled whenever `update()` is called. If `irq`
+        is set, a pin interrupt timestamps every edge instead, and `update()`
+        processes the recorded edges, so gestures are timed exactly no matter
+        how often it is called. `on_edge` is then called with no arguments from
+        the interrupt handler after every edge, e.g. to wake the task calling
+        `update()`, and must not allocate memory.
+
+        """
         self._pin = pin
         self._pressed = False
         self._clicked = False
@@ -18,39 +32,167 @@ class Button:
         self._hold = 0
         self._doubleclick = 0
 
-        if self._pin():
+        self._irq = irq
+        self._on_edge_callback = on_edge
+        if irq:
+            # Edge timestamps (in microseconds) and pin levels, written by the
+            # interrupt handler and read by update().
+            self._edge_times = array("L", [0] * self.EDGE_BUFFER_SIZE)
+            self._edge_levels = bytearray(self.EDGE_BUFFER_SIZE)
+            self._edge_head = 0
+            self._edge_tail = 0
+            self._edge_overflows = 0
+            self._level = 0
+            self._pending = False
+            self._pending_level = 0
+            self._pending_time = 0
+            self._pin.irq(
+                handler=self._on_edge, trigger=Pin.IRQ_RISING | Pin.IRQ_FALLING
+            )
+            self._record(utime.ticks_us(), self._pin())
+        elif self._pin():
             self._debounce = utime.ticks_ms()
 
+    def _on_edge(self, pin: Pin) -> None:
+        self._record(utime.ticks_us(), pin())
+        if self._on_edge_callback:
+            self._on_edge_callback()
+
+    def _record(self, time: int, level: int) -> None:
+        """Add an edge to the ring buffer, dropping it if the buffer is full."""
+        head = (self._edge_head + 1) % self.EDGE_BUFFER_SIZE
+        if head == self._edge_tail:
+            self._edge_overflows += 1
+            return
+        self._edge_times[self._edge_head] = time
+        self._edge_levels[self._edge_head] = level
+        self._edge_head = head
+
+    @property
+    def overflows(self) -> int:
+        """Returns the number of edges dropped because the buffer was full."""
+        return self._edge_overflows if self._irq else 0
+
     def update(self) -> None:
-        now = utime.ticks_ms()
+        if self._irq:
+            self._update_edges(utime.ticks_us())
+        else:
+            self._update_polled(utime.ticks_ms())
+
+    def next_update_ms(self):
+        """Return how many milliseconds from now `update()` next needs to be
+        called to time out a gesture, or None if nothing will happen until the
+        next edge.
+
+        Without interrupts, the pin must be polled every `POLL_MS`.
+
+        """
+        if not self._irq:
+            return self.POLL_MS
+        if self._edge_tail != self._edge_head:
+            # Edges are waiting to be processed
+            return 0
+        now = utime.ticks_us()
+        deadline = None
+        if self._pending:
+            deadline = self._until(now, self._pending_time, self.DEBOUNCE_MS, deadline)
+        if self._pressed and self._hold:
+            deadline = self._until(now, self._hold, self.HOLD_MS, deadline)
+        if not self._pressed and self._doubleclick:
+            # Single clicks time out once the double click period has passed
+            deadline = self._until(
+                now, self._doubleclick, self.DOUBLECLICK_MS + 1, deadline
+            )
+        return deadline
 
+    @staticmethod
+    def _until(now: int, since: int, period_ms: int, deadline):
+        """Return the earlier of a deadline and `period_ms` after `since`."""
+        remaining = utime.ticks_diff(utime.ticks_add(since, period_ms * 1000), now)
+        remaining = max(0, (remaining + 999) // 1000)
+        return remaining if deadline is None else min(deadline, remaining)
+
+    def _update_polled(self, now: int) -> None:
         if self._pin():
             if self._debounce and now - self._debounce >= self.DEBOUNCE_MS:
                 self._debounce = 0
-                self._pressed = True
-                self._hold = now
+                self._press(now)
             elif not self._pressed and not self._debounce:
                 self._debounce = now
-            elif self._hold and now - self._hold >= self.HOLD_MS:
-                self._hold = 0
-                self._held = True
+        elif self._pressed:
+            self._release(now, self.DOUBLECLICK_MS)
+        self._check_timers(now, 1)
+
+    def _update_edges(self, now: int) -> None:
+        # A level is accepted once no other edge follows it within the
+        # debounce period, and takes effect at the time of its edge.
+        debounce = self.DEBOUNCE_MS * 1000
+        while self._edge_tail != self._edge_head:
+            time = self._edge_times[self._edge_tail]
+            level = self._edge_levels[self._edge_tail]
+            self._edge_tail = (self._edge_tail + 1) % self.EDGE_BUFFER_SIZE
+            if (
+                self._pending
+                and utime.ticks_diff(time, self._pending_time) >= debounce
+            ):
+                self._accept(self._pending_level, self._pending_time)
+            self._pending = True
+            self._pending_level = level
+            self._pending_time = time
+        if self._pending and utime.ticks_diff(now, self._pending_time) >= debounce:
+            self._pending = False
+            self._accept(self._pending_level, self._pending_time)
+        self._check_timers(now, 1000)
+
+    def _accept(self, level: int, time: int) -> None:
+        # Time out earlier gestures before applying the new level
+        self._check_timers(time, 1000)
+        if level == self._level:
+            return
+        self._level = level
+        if level:
+            self._press(time)
         else:
-            if self._pressed:
-                self._pressed = False
-                if self._doubleclick:
-                    if now - self._doubleclick <= self.DOUBLECLICK_MS:
-                        self._doubleclicked = True
-                        self._doubleclick = 0
-                        self._hold = 0
-                        self._held = False
-                else:
-                    self._doubleclick = now
-            if self._doubleclick and now - self._doubleclick > self.DOUBLECLICK_MS:
-                if not self._held:
-                    self._clicked = True
+            self._release(time, self.DOUBLECLICK_MS * 1000)
+
+    def _press(self, now: int) -> None:
+        self._pressed = True
+        self._hold = now
+
+    def _release(self, now: int, doubleclick: int) -> None:
+        self._pressed = False
+        if self._doubleclick:
+            if utime.ticks_diff(now, self._doubleclick) <= doubleclick:
+                self._doubleclicked = True
                 self._doubleclick = 0
                 self._hold = 0
                 self._held = False
+        else:
+            self._doubleclick = now
+
+    def _check_timers(self, now: int, scale: int) -> None:
+        """Detect holds and single clicks that have timed out.
+
+        Times are in milliseconds times `scale`.
+
+        """
+        if (
+            self._pressed
+            and self._hold
+            and utime.ticks_diff(now, self._hold) >= self.HOLD_MS * scale
+        ):
+            self._hold = 0
+            self._held = True
+        if (
+            not self._pressed
+            and self._doubleclick
+            and utime.ticks_diff(now, self._doubleclick) > self.DOUBLECLICK_MS * scale
+        ):
+            if not self._held:
+                self._clicked = True
+            self._doubleclick = 0
+            self._hold = 0
+            self._held = False
 
     def pressed(self) -> bool:
         return self._pressed
@@ -72,7 +214,7 @@ class Button:
 
 
 if __name__ == "__main__":
-    button = Button(Pin(36, Pin.IN))
+    button = Button(Pin(36, Pin.IN), irq=True)
     while True:
         button.update()
         if button.was_clicked():
@@ -0,0 +1,9 @@
+"""Run the tests under CPython using the simulator's fake MicroPython modules.
+
+On the device, the tests are run with `make test` and this file is not deployed.
+
+"""
+
+import sim
+
+sim.install()
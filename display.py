@@ -0,0 +1,175 @@
+"""Paced display updates
+
+Redraw requests are coalesced and rendered at most once per frame period, so
+a burst of changes (e.g. spinning the volume knob) costs one frame, showing
+the latest state, instead of one for every change. The time spent rendering
+and flushing each frame, and the number of requests absorbed into other
+frames, are recorded.
+
+The frame can be sent to the display in one go (blocking every other task
+until it has been sent), a page at a time with other tasks running in between,
+or by a worker thread from a copy of the frame, leaving the framebuffer free
+for drawing the next one.
+
+Copyright 2023 Correl Roush
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the “Software”), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so,
+subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import uasyncio
+import utime
+
+from stats import Histogram
+
+
+class FlushWorker:
+    """Sends frames to the display from a second thread.
+
+    Each frame is copied to a front buffer before being sent, so the next one
+    can be drawn in the meantime. The display must not be used from any other
+    thread while the worker is running.
+
+    On ports where threads share a global interpreter lock (like the ESP32),
+    this only helps when the bus driver releases the lock while it transfers
+    data, as the hardware I2C driver does, and bit-banged SoftI2C does not.
+
+    """
+
+    def __init__(self, oled) -> None:
+        import _thread
+
+        self.oled = oled
+        self.front = bytearray(len(oled.framebuf_data))
+        # Sent through a view, so slicing out pages doesn't copy them
+        self._front_view = memoryview(self.front)
+        self.region = None
+        self.busy = False
+        self.frames = 0
+        self._done = uasyncio.ThreadSafeFlag()
+        # Released by the main thread when there is a frame to send
+        self._frame = _thread.allocate_lock()
+        self._frame.acquire()
+        _thread.start_new_thread(self._run, ())
+
+    async def submit(self, region=None) -> None:
+        """Queue the current framebuffer to be sent, once the previous frame
+        has been."""
+        while self.busy:
+            await self._done.wait()
+        self.front[:] = self.oled.framebuf_data
+        self.region = region
+        self.busy = True
+        self._frame.release()
+
+    def _run(self) -> None:
+        while True:
+            self._frame.acquire()
+            for _ in self.oled.show_pages(self.region, self._front_view):
+                pass
+            self.frames += 1
+            self.busy = False
+            self._done.set()
+
+
+class Display:
+    # How frames are sent to the display
+    FLUSH_SYNC = "sync"
+    FLUSH_PAGED = "paged"
+    FLUSH_THREAD = "thread"
+
+    def __init__(
+        self,
+        oled,
+        render,
+        fps: int = 15,
+        render_time: Histogram = None,
+        flush_time: Histogram = None,
+        flush: str = FLUSH_SYNC,
+    ) -> None:
+        """Create a display pipeline.
+
+        `render` is called with no arguments to draw a frame into the `oled`
+        framebuffer. It returns the (x, y, width, height) region it redrew,
+        which is then flushed with `oled.show()`, or None if it didn't change
+        anything, in which case nothing is sent. At most `fps` frames are
+        drawn per second.
+
+        With `FLUSH_PAGED`, the display is sent one page at a time, letting
+        other tasks run in between. With `FLUSH_THREAD`, a `FlushWorker`
+        sends it in the background. The flush time is how long the display
+        task was kept from drawing the next frame.
+
+        """
+        self.oled = oled
+        self.render = render
+        self.frame_ms = 1000 // fps
+        self.render_time = render_time or Histogram("render")
+        self.flush_time = flush_time or Histogram("flush")
+        self.frames = 0
+        self.dropped = 0
+        self.flush = flush
+        self.worker = FlushWorker(oled) if flush == self.FLUSH_THREAD else None
+        self._requests = 0
+        self._event = uasyncio.Event()
+
+    def request(self, *args) -> None:
+        """Ask for a frame to be drawn, accepting and ignoring any arguments so
+        it can be used directly as a callback."""
+        self._requests += 1
+        self._event.set()
+
+    async def run(self) -> None:
+        last_frame = utime.ticks_add(utime.ticks_ms(), -self.frame_ms)
+        while True:
+            await self._event.wait()
+            delay = self.frame_ms - utime.ticks_diff(utime.ticks_ms(), last_frame)
+            if delay > 0:
+                # Requests made while waiting for the frame are drawn with it
+                await uasyncio.sleep_ms(delay)
+            self._event.clear()
+            self.dropped += self._requests - 1
+            self._requests = 0
+            last_frame = utime.ticks_ms()
+
+            start = utime.ticks_us()
+            region = self.render()
+            self.render_time.since(start)
+            if region is None:
+                # Nothing visible changed
+                continue
+            # Let input be handled between drawing and sending the frame
+            await uasyncio.sleep_ms(0)
+            start = utime.ticks_us()
+            if self.worker:
+                await self.worker.submit(region)
+            elif self.flush == self.FLUSH_PAGED:
+                for _ in self.oled.show_pages(region):
+                    await uasyncio.sleep_ms(0)
+            else:
+                self.oled.show(region=region)
+            self.flush_time.since(start)
+            self.frames += 1
+
+    def summary(self) -> dict:
+        return {"frames": self.frames, "dropped": self.dropped}
+
+    def reset(self) -> None:
+        """Start a new reporting period."""
+        self.frames = 0
+        self.dropped = 0
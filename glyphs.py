@@ -0,0 +1,126 @@
+"""Cached text rendering
+
+Rasterizing text with the built-in font costs the same every time it is drawn,
+even though the display shows the same few strings over and over. A
+`GlyphCache` rasterizes each character once per font into a small framebuffer
+tile, and draws text from then on by blitting the tiles. This also makes larger
+fonts, scaled up from the built-in one, as cheap to draw as the built-in font.
+
+Copyright 2023 Correl Roush
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the “Software”), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so,
+subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import framebuf
+
+
+def _tile(width: int, height: int) -> framebuf.FrameBuffer:
+    buffer = bytearray(width * ((height + 7) // 8))
+    return framebuf.FrameBuffer(buffer, width, height, framebuf.MONO_VLSB)
+
+
+class Font:
+    """The built-in 8x8 font."""
+
+    def __init__(self) -> None:
+        self.width = 8
+        self.height = 8
+
+    def render(self, text: str) -> framebuf.FrameBuffer:
+        """Rasterize text into a new tile."""
+        tile = _tile(len(text) * self.width, self.height)
+        tile.text(text, 0, 0, 1)
+        return tile
+
+
+class ScaledFont(Font):
+    """The built-in font, with each pixel scaled up to a square."""
+
+    def __init__(self, scale: int) -> None:
+        super().__init__()
+        self.scale = scale
+        self.width *= scale
+        self.height *= scale
+
+    def render(self, text: str) -> framebuf.FrameBuffer:
+        small = super().render(text)
+        tile = _tile(len(text) * self.width, self.height)
+        scale = self.scale
+        for x in range(len(text) * 8):
+            for y in range(8):
+                if small.pixel(x, y):
+                    tile.fill_rect(x * scale, y * scale, scale, scale, 1)
+        return tile
+
+
+FONT = Font()
+
+
+class GlyphCache:
+    def __init__(self, size: int = 96) -> None:
+        """Create a cache holding the tiles of up to `size` characters, across
+        all fonts.
+
+        Strings are drawn a character at a time, so the tiles of a few
+        characters (e.g. the digits) cover every string made of them. When the
+        cache is full, the tile cached first is dropped to make room.
+
+        """
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        # Tiles by character code, for each font
+        self._fonts = {}
+        # (font, code) of every cached tile, in the order they were added
+        self._order = []
+
+    def get(self, char: str, font: Font = FONT) -> framebuf.FrameBuffer:
+        """Return the tile of a character, rasterizing it if it isn't
+        cached."""
+        code = ord(char)
+        tiles = self._fonts.get(font)
+        if tiles is None:
+            tiles = self._fonts[font] = {}
+        tile = tiles.get(code)
+        if tile is not None:
+            self.hits += 1
+            return tile
+        self.misses += 1
+        if len(self._order) >= self.size:
+            oldest_font, oldest_code = self._order.pop(0)
+            del self._fonts[oldest_font][oldest_code]
+        tile = tiles[code] = font.render(char)
+        self._order.append((font, code))
+        return tile
+
+    def text(self, fb, text: str, x: int, y: int, font: Font = FONT) -> None:
+        """Draw text like `FrameBuffer.text()`, setting its pixels and leaving
+        the rest untouched."""
+        for char in text:
+            if char != " ":
+                fb.blit(self.get(char, font), x, y, 0)
+            x += font.width
+
+    def clear(self) -> None:
+        self._fonts.clear()
+        self._order.clear()
+
+
+# Shared by everything drawing on the display
+cache = GlyphCache()
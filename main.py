@@ -7,14 +7,19 @@ import ubinascii
 import uasyncio
 import utime
 
-from umqtt.simple import MQTTClient
-
 import cd4052
 import ssd1306
 import mcp4
 from button import Button
+from display import Display
+from memmon import MemoryMonitor
+from mqtt_async import MQTTClient
 from rotary_irq_esp import RotaryIRQ
+from rotary_pcnt_esp import RotaryPCNT
+from stats import Stats
 from statetree import StateTree
+from wakeup import Wakeup
+from widgets import Bar, Box, Label, Number, Screen
 
 VOLUME_MAX = const(128)
 
@@ -22,6 +27,23 @@ MQTT_KEEPALIVE = const(60)
 MQTT_UPDATE_INTERVAL = const(60)
 MQTT_RECONNECT_INTERVAL = const(60)
 
+# Polling interval for inputs that can't interrupt (the PCNT encoder counter)
+INPUT_INTERVAL_MS = const(10)
+WIFI_INTERVAL_MS = const(1000)
+WIFI_CONNECTED_INTERVAL_MS = const(5000)
+MQTT_PUBLISH_INTERVAL_MS = const(250)
+POT_VERIFY_INTERVAL_MS = const(5000)
+DIAGNOSTICS_INTERVAL_MS = const(60000)
+# Draw at most this many frames per second, however fast the state changes
+DISPLAY_FPS = const(15)
+# Collect garbage when idle if less than this many bytes are free
+GC_FREE_MIN = const(32768)
+# Only collect garbage once the controls have been left alone this long
+GC_IDLE_MS = const(1000)
+# With light sleep enabled, sleep in slices this long after this much idle time
+LIGHT_SLEEP_MS = const(1000)
+LIGHT_SLEEP_AFTER_MS = const(30000)
+
 channels = ["LINE 1", "LINE 2", "PHONO", "DAC"]
 state = StateTree(
     {
@@ -35,18 +57,48 @@ state = StateTree(
     }
 )
 last_update = 0
+published_version = -1
+# Set when garbage was left to be collected once the controls are idle
+collect_pending = False
+
+# Time taken by each stage of the firmware, in microseconds
+stats = Stats()
+input_time = stats.histogram("input")
+pot_write_time = stats.histogram("pot_write")
+pot_verify_time = stats.histogram("pot_verify")
+hardware_time = stats.histogram("hardware")
+wifi_time = stats.histogram("wifi")
+mqtt_message_time = stats.histogram("mqtt_message")
+mqtt_publish_time = stats.histogram("mqtt_publish")
+render_time = stats.histogram("render")
+flush_time = stats.histogram("flush")
+wake_time = stats.histogram("wake")
+memory = MemoryMonitor()
+
+with open("settings.json", "r") as f:
+    settings = json.load(f)
 
-rotary = RotaryIRQ(
+# The encoder can be counted in hardware instead of by interrupts (on ports with
+# machine.Encoder), at the cost of polling the count
+Rotary = RotaryPCNT if settings.get("encoder") == "pcnt" else RotaryIRQ
+rotary = Rotary(
     33,
     32,
     0,
     max_val=128,
-    range_mode=RotaryIRQ.RANGE_BOUNDED,
+    range_mode=Rotary.RANGE_BOUNDED,
     pull_up=True,
-    incr=4,
+    incr=1,
+    # Turning faster covers the range in fewer detents
+    accel=((40, 8), (80, 4), (150, 2)),
 )
 rotary_value = rotary.value()
-rotary_button = Button(Pin(36, Pin.IN))
+volume_target = rotary_value
+# Raised by the encoder and button when the input task has work to do
+input_wakeup = Wakeup(latency=wake_time)
+rotary.add_listener(input_wakeup.set)
+rotary_button = Button(Pin(36, Pin.IN), irq=True, on_edge=input_wakeup.set)
+last_input = utime.ticks_ms()
 
 try:
     i2c = SoftI2C(sda=Pin(21), scl=Pin(22))
@@ -64,25 +116,29 @@ sta_if = network.WLAN(network.STA_IF)
 
 spi = SPI(1)
 cs = Pin(15, mode=Pin.OUT, value=1)
-pot = mcp4.MCP4(spi, cs)
-
-with open("settings.json", "r") as f:
-    settings = json.load(f)
+pot = mcp4.MCP4(spi, cs, wiper_max=VOLUME_MAX)
+volumes = [0, 0]
 
-mqtt = None
-mqtt_client_id = ubinascii.hexlify(machine.unique_id())
+mqtt_client_id = ubinascii.hexlify(machine.unique_id()).decode()
 mqtt_broker = settings["mqtt"]["broker"]
 mqtt_prefix = settings["mqtt"]["prefix"]
-last_mqtt_attempt = 0
+mqtt = MQTTClient(
+    mqtt_client_id,
+    mqtt_broker,
+    keepalive=MQTT_KEEPALIVE,
+    backoff_max_ms=MQTT_RECONNECT_INTERVAL * 1000,
+)
 
+# Raised when the state has changed and needs to be published.
+publish_event = uasyncio.Event()
+# Raised when the inputs need to be applied to the hardware right away.
+hardware_event = uasyncio.Event()
 
-def mqtt_init():
-    print("Starting MQTT client")
-    mqtt = MQTTClient(mqtt_client_id, mqtt_broker, keepalive=MQTT_KEEPALIVE)
-    mqtt.set_callback(on_message)
-    mqtt.set_last_will(f"{mqtt_prefix}/status", b"offline", retain=True)
-    mqtt.connect()
-    mqtt.subscribe(f"{mqtt_prefix}/set")
+
+def mqtt_discovery():
+    global published_version
+
+    print(f"MQTT connected to {mqtt_broker}")
     mqtt_device = {
         "identifiers": mqtt_client_id,
         "manufacturer": "correl",
@@ -190,20 +246,27 @@ def mqtt_init():
         ).encode(),
         retain=True,
     )
-    return mqtt
+    # Publish the current state as soon as the client is connected
+    published_version = -1
+    publish_event.set()
 
 
 def on_message(topic, msg):
     print(f"MQTT <- [{topic}] {msg}")
+    start = utime.ticks_us()
     try:
         msg = json.loads(msg)
     except:
         return
     if volume := msg.get("volume"):
-        if isinstance(volume.get("left"), int):
-            pot.write(0, volume["left"])
-        if isinstance(volume.get("right"), int):
-            pot.write(1, volume["right"])
+        for wiper, side in enumerate(("left", "right")):
+            value = volume.get(side)
+            if not isinstance(value, int):
+                continue
+            if 0 <= value <= VOLUME_MAX:
+                pot.write(wiper, value)
+            else:
+                print("WARNING: Attempted to set invalid volume", side, value)
         if isinstance(volume.get("muted"), str):
             switch.mute(volume["muted"] == "ON")
     if isinstance(msg.get("channel"), str):
@@ -211,99 +274,270 @@ def on_message(topic, msg):
             switch.select(channels.index(msg["channel"]))
         except ValueError:
             print("WARNING: Attempted to select invalid channel", msg["channel"])
+    hardware_event.set()
+    mqtt_message_time.since(start)
 
 
-def loop():
-    global mqtt, state, last_update, last_mqtt_attempt
-    global rotary, rotary_button, rotary_value
+async def input_task():
+    global rotary_value, last_input
 
-    rotary_button.update()
-    if rotary_button.was_clicked():
-        switch.toggle_mute()
-    if rotary_button.was_double_clicked():
-        if switch.channel() >= 3:
-            switch.select(0)
-        else:
-            switch.select(switch.channel() + 1)
-
-    state["volume"]["left"] = pot.read(0)
-    state["volume"]["right"] = pot.read(1)
-    state["volume"]["muted"] = "ON" if switch.muted() else "OFF"
-    state["channel"] = channels[switch.channel()]
-
-    if state.changed:
-        # Volume changed externally
-        rotary.set(value=max(state["volume"]["left"], state["volume"]["right"]))
-        rotary_value = rotary.value()
-
-    new_value = rotary.value()
-    if rotary_value != new_value:
-        print("Rotary:", new_value)
-        state["volume"]["left"] = new_value
-        state["volume"]["right"] = new_value
-        pot.write(0, new_value)
-        pot.write(1, new_value)
-        rotary_value = new_value
-
-    if not sta_if.active():
-        print("Connecting to WiFi")
-        sta_if.active(True)
-        sta_if.connect(settings["wifi"]["ssid"], settings["wifi"]["password"])
-
-    if sta_if.active() and not sta_if.isconnected():
-        state["network"] = "ACT"
-    if sta_if.isconnected():
-        ip, _, _, _ = sta_if.ifconfig()
-        if ip == "0.0.0.0":
-            # Something went wrong, try to reconnect
-            print("IP invalid, retrying WiFi connection")
-            state["network"] = "ACT"
+    while True:
+        # Sleep until an interrupt, or a button gesture times out
+        timeout = rotary_button.next_update_ms()
+        if Rotary is RotaryPCNT:
+            # The hardware counter doesn't interrupt, so it has to be polled
+            timeout = INPUT_INTERVAL_MS if timeout is None else min(
+                timeout, INPUT_INTERVAL_MS
+            )
+        await input_wakeup.wait(timeout)
+        input_wakeup.handled()
+
+        start = utime.ticks_us()
+        memory.mark()
+        rotary_button.update()
+        if rotary_button.was_clicked():
+            switch.toggle_mute()
+            hardware_event.set()
+        if rotary_button.was_double_clicked():
+            if switch.channel() >= 3:
+                switch.select(0)
+            else:
+                switch.select(switch.channel() + 1)
+            hardware_event.set()
+
+        moved = False
+        while rotary.read_event() is not None:
+            moved = True
+        if moved:
+            rotary_value = rotary.value()
+            print("Rotary:", rotary_value)
+            hardware_event.set()
+        if hardware_event.is_set():
+            last_input = utime.ticks_ms()
+        input_time.since(start)
+        memory.measure()
+
+
+async def hardware_task():
+    global volume_target, rotary_value
+
+    last_verify = utime.ticks_ms()
+    while True:
+        # Wake for changes to apply, or when the pots are due to be verified
+        timeout = POT_VERIFY_INTERVAL_MS - utime.ticks_diff(
+            utime.ticks_ms(), last_verify
+        )
+        try:
+            await uasyncio.wait_for_ms(hardware_event.wait(), max(0, timeout))
+        except uasyncio.TimeoutError:
+            pass
+        hardware_event.clear()
+        start = utime.ticks_us()
+
+        if volume_target != rotary_value:
+            volumes[0] = volumes[1] = rotary_value
+            pot.write_many(volumes)
+            volume_target = rotary_value
+            pot_write_time.since(start)
+
+        if utime.ticks_diff(utime.ticks_ms(), last_verify) >= POT_VERIFY_INTERVAL_MS:
+            last_verify = utime.ticks_ms()
+            verify_start = utime.ticks_us()
+            drifted = pot.verify()
+            pot_verify_time.since(verify_start)
+            if drifted:
+                print("WARNING: Potentiometer registers changed:", drifted)
+
+        state["volume"]["left"] = pot.read(0)
+        state["volume"]["right"] = pot.read(1)
+        state["volume"]["muted"] = "ON" if switch.muted() else "OFF"
+        state["channel"] = channels[switch.channel()]
+
+        volume = max(state["volume"]["left"], state["volume"]["right"])
+        if volume != volume_target:
+            # Volume changed externally
+            rotary.set(value=volume)
+            rotary_value = volume_target = rotary.value()
+        state.commit()
+        hardware_time.since(start)
+
+
+def input_idle() -> bool:
+    return utime.ticks_diff(utime.ticks_ms(), last_input) >= GC_IDLE_MS
+
+
+async def wifi_task():
+    global collect_pending
+
+    while True:
+        start = utime.ticks_us()
+        if not sta_if.active():
+            print("Connecting to WiFi")
             sta_if.active(True)
             sta_if.connect(settings["wifi"]["ssid"], settings["wifi"]["password"])
-        elif state["network"] != "OK":
-            print(f"WIFI Connected to {sta_if.config('ssid')}")
-            print(f"IP Address: {ip}")
-            state["network"] = "OK"
-        if not mqtt and utime.time() - last_mqtt_attempt >= MQTT_RECONNECT_INTERVAL:
-            last_mqtt_attempt = utime.time()
-            try:
-                mqtt = mqtt_init()
-            except OSError as e:
-                print(f"Failed to connect to MQTT ({mqtt_broker}): {e}")
-        if mqtt:
-            if state.changed or utime.time() - last_update >= MQTT_UPDATE_INTERVAL:
-                topic = f"{mqtt_prefix}/state".encode()
-                payload = json.dumps(state.dictionary).encode()
-                print(f"MQTT -> [{topic}] {payload}")
-                mqtt.publish(f"{mqtt_prefix}/status", b"online", retain=True)
-                mqtt.publish(topic, payload, retain=True)
-                last_update = utime.time()
-            mqtt.check_msg()
-    if oled and state.changed:
-        oled.fill(0)
-        oled.framebuf.rect(10, 0, 92, 8, 1)
-        oled.framebuf.rect(
-            12, 2, round(state["volume"]["left"] / VOLUME_MAX * 88), 4, 1, True
-        )
-        oled.framebuf.rect(10, 10, 92, 8, 1)
-        oled.framebuf.rect(
-            12, 12, round(state["volume"]["right"] / VOLUME_MAX * 88), 4, 1, True
+
+        if sta_if.active() and not sta_if.isconnected():
+            state["network"] = "ACT"
+        if sta_if.isconnected():
+            ip, _, _, _ = sta_if.ifconfig()
+            if ip == "0.0.0.0":
+                # Something went wrong, try to reconnect
+                print("IP invalid, retrying WiFi connection")
+                state["network"] = "ACT"
+                sta_if.active(True)
+                sta_if.connect(settings["wifi"]["ssid"], settings["wifi"]["password"])
+            elif state["network"] != "OK":
+                print(f"WIFI Connected to {sta_if.config('ssid')}")
+                print(f"IP Address: {ip}")
+                state["network"] = "OK"
+        state.commit()
+        wifi_time.since(start)
+        if input_idle() and (collect_pending or memory.below(GC_FREE_MIN)):
+            memory.collect()
+            collect_pending = False
+        await uasyncio.sleep_ms(
+            WIFI_CONNECTED_INTERVAL_MS if state["network"] == "OK" else WIFI_INTERVAL_MS
         )
-        oled.text("L", 0, 0)
-        oled.text("R", 0, 10)
-        oled.text(f"{state['volume']['left']:3d}", 104, 0)
-        oled.text(f"{state['volume']['right']:3d}", 104, 10)
-        if state["volume"]["muted"] == "ON":
-            oled.framebuf.rect(40, 4, 4 * 8 + 2, 10, 0, True)
-            oled.framebuf.rect(39, 3, 4 * 8 + 4, 12, 1)
-            oled.framebuf.rect(38, 2, 4 * 8 + 6, 14, 0)
-            oled.text("MUTE", 41, 5)
-        oled.text(f"WiFi: {state['network']}", 0, 20)
-        oled.text(f'{state["channel"]:>6}', 80, 20)
-        oled.show()
-    state.clean()
-
-
-while True:
-    loop()
-    utime.sleep_ms(10)
+
+
+async def mqtt_task():
+    global last_update, published_version, collect_pending
+
+    client_started = False
+    while True:
+        # Wake for changes to publish (including the network or broker
+        # connecting), or when the periodic update is due
+        timeout = MQTT_UPDATE_INTERVAL
+        if mqtt.connected:
+            timeout = max(0, timeout - (utime.time() - last_update))
+        try:
+            await uasyncio.wait_for_ms(publish_event.wait(), timeout * 1000)
+        except uasyncio.TimeoutError:
+            pass
+        publish_event.clear()
+        if not client_started and sta_if.isconnected():
+            print("Starting MQTT client")
+            uasyncio.create_task(mqtt.run())
+            client_started = True
+        if not mqtt.connected:
+            continue
+        if (
+            state.version != published_version
+            or utime.time() - last_update >= MQTT_UPDATE_INTERVAL
+        ):
+            start = utime.ticks_us()
+            topic = f"{mqtt_prefix}/state".encode()
+            payload = json.dumps(state.dictionary).encode()
+            print(f"MQTT -> [{topic}] {payload}")
+            mqtt.publish(f"{mqtt_prefix}/status", b"online", retain=True)
+            mqtt.publish(topic, payload, retain=True)
+            last_update = utime.time()
+            published_version = state.version
+            mqtt_publish_time.since(start)
+            # Collect the garbage of building the update before the next one,
+            # unless the controls are in use, leaving it to the WiFi task
+            if input_idle():
+                memory.collect()
+            else:
+                collect_pending = True
+            # Let changes made in the meantime collect into the next update
+            await uasyncio.sleep_ms(MQTT_PUBLISH_INTERVAL_MS)
+
+
+screen = Screen(
+    Label(0, 0, 1, "L"),
+    Label(0, 10, 1, "R"),
+    Label(0, 20, 5, "WiFi:"),
+)
+left_bar = screen.add(Bar(10, 0, 92, 8, VOLUME_MAX))
+right_bar = screen.add(Bar(10, 10, 92, 8, VOLUME_MAX))
+left_number = screen.add(Number(104, 0, 3))
+right_number = screen.add(Number(104, 10, 3))
+network_label = screen.add(Label(48, 20, 3))
+channel_label = screen.add(Label(80, 20, 6, align=">"))
+mute_box = screen.add(Box(38, 2, 4 * 8 + 6, 14, "MUTE"))
+
+
+def render():
+    left_bar.set(state["volume"]["left"])
+    right_bar.set(state["volume"]["right"])
+    left_number.set(state["volume"]["left"])
+    right_number.set(state["volume"]["right"])
+    mute_box.set(state["volume"]["muted"] == "ON")
+    network_label.set(state["network"])
+    channel_label.set(state["channel"])
+    return screen.draw(oled.framebuf)
+
+
+display = Display(
+    oled,
+    render,
+    fps=DISPLAY_FPS,
+    render_time=render_time,
+    flush_time=flush_time,
+    flush=settings.get("display_flush", Display.FLUSH_SYNC) if oled else None,
+)
+
+
+async def idle_task():
+    """Light sleep while nobody is using the controls.
+
+    The encoder and button wake the CPU early. Sleeping in slices lets the other
+    tasks catch up on their timers (e.g. MQTT keepalives) in between.
+
+    """
+    import esp32
+
+    esp32.wake_on_ext0(pin=Pin(33), level=esp32.WAKEUP_ALL_LOW)
+    esp32.wake_on_ext1(pins=(Pin(36),), level=esp32.WAKEUP_ANY_HIGH)
+    while True:
+        if utime.ticks_diff(utime.ticks_ms(), last_input) >= LIGHT_SLEEP_AFTER_MS:
+            machine.lightsleep(LIGHT_SLEEP_MS)
+            await uasyncio.sleep_ms(0)
+        else:
+            await uasyncio.sleep_ms(LIGHT_SLEEP_MS)
+
+
+async def diagnostics_task():
+    while True:
+        await uasyncio.sleep_ms(DIAGNOSTICS_INTERVAL_MS)
+        diagnostics = stats.summary()
+        diagnostics["memory"] = memory.summary()
+        diagnostics["display"] = display.summary()
+        stats.dump()
+        print("Memory:", diagnostics["memory"])
+        print("Display:", diagnostics["display"])
+        if mqtt.connected:
+            mqtt.publish(
+                f"{mqtt_prefix}/diagnostics", json.dumps(diagnostics).encode()
+            )
+        stats.reset()
+        memory.reset()
+        display.reset()
+
+
+async def main():
+    # Start from a clean heap, now that everything has been set up
+    memory.collect()
+    mqtt.set_callback(on_message)
+    mqtt.set_connect_callback(mqtt_discovery)
+    mqtt.set_last_will(f"{mqtt_prefix}/status", b"offline", retain=True)
+    mqtt.subscribe(f"{mqtt_prefix}/set")
+    state.watch((), lambda _: publish_event.set())
+
+    tasks = [
+        uasyncio.create_task(input_task()),
+        uasyncio.create_task(hardware_task()),
+        uasyncio.create_task(wifi_task()),
+        uasyncio.create_task(mqtt_task()),
+        uasyncio.create_task(diagnostics_task()),
+    ]
+    if settings.get("light_sleep"):
+        tasks.append(uasyncio.create_task(idle_task()))
+    if oled:
+        state.watch((), display.request)
+        tasks.append(uasyncio.create_task(display.run()))
+    await uasyncio.gather(*tasks)
+
+
+uasyncio.run(main())
@@ -71,6 +71,30 @@ class TerminalControl:
         )
 
 
+# Command bytes indexed by (address << 2 | command), without data bits
+_COMMANDS = bytes(
+    address << 4 | command << 2 for address in range(16) for command in range(4)
+)
+
+
+def encode_command(
+    buffer: bytearray, offset: int, address: int, command: int, data: int = 0x0
+) -> int:
+    """Encode a command into a buffer at an offset, returning its length.
+
+    See `command_bytes` for a description of the arguments.
+
+    """
+    command_byte = _COMMANDS[(address & 0b1111) << 2 | command & 0b11]
+    if command == 0b00 or command == 0b11:
+        # Include data byte for 10 total bits of data
+        buffer[offset] = command_byte | (0b11 & data >> 8)
+        buffer[offset + 1] = data & 0xFF
+        return 2
+    buffer[offset] = command_byte
+    return 1
+
+
 def command_bytes(address: int, command: int, data: int = 0x0) -> bytearray:
     """Translate an address, command, and data into bytes to send.
 
@@ -80,11 +104,8 @@ def command_bytes(address: int, command: int, data: int = 0x0) -> bytearray:
       10 bits for read and write operations.
 
     """
-    command_byte = address << 4 & 0b11110000 | command << 2 & 0b00001100
-    if command in (0b00, 0b11):
-        # Include data byte for 10 total bits of data
-        return bytearray([command_byte | (0b11 & data >> 8), data & 0xFF])
-    return bytearray([command_byte])
+    buffer = bytearray(2)
+    return buffer[: encode_command(buffer, 0, address, command, data)]
 
 
 class MCP4:
@@ -100,32 +121,126 @@ class MCP4:
     CMD_DECREMENT = 0b10
     CMD_READ = 0b11
 
-    def __init__(self, spi: SPI, cs: Pin) -> None:
+    def __init__(self, spi: SPI, cs: Pin, wiper_max: int = 0x100) -> None:
+        """Create a new driver.
+
+        Register values are cached as they are written, so reads of a wiper
+        the driver has already written or read don't need an SPI transaction.
+        `wiper_max` is the full scale wiper value of the device (0x80 for 7-bit
+        and 0x100 for 8-bit devices), used to track increments and decrements.
+
+        """
         self.spi = spi
         self.cs = cs
-
-    def _write(self, data: bytearray) -> bytearray:
-        """Write data to the SPI interface, returning its output."""
-        output = bytearray(len(data))
-        self.spi.write_readinto(data, output)
-        return output
+        self.wiper_max = wiper_max
+        self._registers = [None] * 16
+
+        # Preallocated transfer buffers, with views for every transfer length
+        # so commands can be sent without allocating memory.
+        self._tx = bytearray(2 * len(self._registers))
+        self._rx = bytearray(len(self._tx))
+        tx = memoryview(self._tx)
+        rx = memoryview(self._rx)
+        self._tx_views = [tx[:length] for length in range(len(self._tx) + 1)]
+        self._rx_views = [rx[:length] for length in range(len(self._rx) + 1)]
+
+    def _transfer(self, length: int) -> memoryview:
+        """Send the first `length` bytes of the transmit buffer in one
+        transaction, returning a view of the bytes received."""
+        self.cs(0)
+        self.spi.write_readinto(self._tx_views[length], self._rx_views[length])
+        self.cs(1)
+        return self._rx_views[length]
 
     def do(self, address: int, command: int, data: int = 0x0) -> int:
         """Execute a command on the MCP4, returning its integer result."""
-        self.cs(0)
-        output = self._write(command_bytes(address, command, data))
-        self.cs(1)
+        length = encode_command(self._tx, 0, address, command, data)
+        output = self._transfer(length)
 
         OK = 0b11111110
         if OK != output[0] & OK:
-            self.cs(0)
             raise ValueError("Invalid command")
         result = output[0] & 0b01
-        if len(output) > 1:
+        if length > 1:
             result <<= 8
             result |= output[1]
+        self._update_cache(address, command, data, result)
         return result
 
+    def write_many(self, values) -> None:
+        """Set several wipers within a single SPI transaction.
+
+        `values` is a sequence of the values to write to each wiper in order,
+        e.g. `(left, right)`. All commands are clocked out while CS is held
+        low, so both wipers are updated together.
+
+        """
+        if len(values) > 2:
+            raise ValueError("Too many wipers")
+        length = 0
+        wiper = 0
+        while wiper < len(values):
+            address = self.ADDRESS_WIPER_1 if wiper == 1 else self.ADDRESS_WIPER_0
+            length += encode_command(
+                self._tx, length, address, self.CMD_WRITE, values[wiper]
+            )
+            wiper += 1
+        output = self._transfer(length)
+
+        OK = 0b11111110
+        wiper = 0
+        while wiper < len(values):
+            if OK != output[wiper * 2] & OK:
+                # The device ignores every command following an invalid one
+                raise ValueError("Invalid command")
+            address = self.ADDRESS_WIPER_1 if wiper == 1 else self.ADDRESS_WIPER_0
+            self._update_cache(address, self.CMD_WRITE, values[wiper], 0)
+            wiper += 1
+
+    def _update_cache(self, address: int, command: int, data: int, result: int):
+        if command == self.CMD_READ:
+            self._registers[address] = result
+        elif command == self.CMD_WRITE:
+            # Only 10 bits are sent, and wipers written past full scale are set
+            # to full scale
+            data &= 0x3FF
+            if address in (self.ADDRESS_WIPER_0, self.ADDRESS_WIPER_1):
+                if data > self.wiper_max:
+                    data = self.wiper_max
+            self._registers[address] = data
+        elif self._registers[address] is not None:
+            value = self._registers[address]
+            if command == self.CMD_INCREMENT:
+                if value < self.wiper_max:
+                    self._registers[address] = value + 1
+            elif value > 0:
+                self._registers[address] = value - 1
+
+    def register(self, address: int, cached: bool = True) -> int:
+        """Read a register, using the cached value if one is known."""
+        value = self._registers[address]
+        if value is None or not cached:
+            value = self.do(address=address, command=self.CMD_READ)
+        return value
+
+    def invalidate(self) -> None:
+        """Forget all cached register values."""
+        for address in range(len(self._registers)):
+            self._registers[address] = None
+
+    def verify(self) -> list:
+        """Read back every cached register from the device.
+
+        Returns the addresses whose values had drifted from the cache, which
+        is updated to match the device.
+
+        """
+        drifted = []
+        for address, value in enumerate(self._registers):
+            if value is not None and self.register(address, cached=False) != value:
+                drifted.append(address)
+        return drifted
+
     def increment(self, wiper: int = 0) -> int:
         """Increment a wiper."""
         return self.do(
@@ -140,11 +255,11 @@ class MCP4:
             command=self.CMD_DECREMENT,
         )
 
-    def read(self, wiper: int = 0) -> int:
+    def read(self, wiper: int = 0, cached: bool = True) -> int:
         """Read the current value of a wiper."""
-        return self.do(
+        return self.register(
             address=self.ADDRESS_WIPER_1 if wiper == 1 else self.ADDRESS_WIPER_0,
-            command=self.CMD_READ,
+            cached=cached,
         )
 
     def write(self, wiper: int = 0, data: int = 0x00) -> int:
@@ -155,11 +270,11 @@ class MCP4:
             data=data,
         )
 
-    def is_shutdown(self) -> bool:
-        status = self.do(address=self.ADDRESS_STATUS, command=self.CMD_READ)
+    def is_shutdown(self, cached: bool = True) -> bool:
+        status = self.register(address=self.ADDRESS_STATUS, cached=cached)
         return status & 0b10 == 0b10
 
     @property
     def control(self) -> TerminalControl:
-        data = self.do(address=self.ADDRESS_TCON, command=self.CMD_READ)
+        data = self.register(address=self.ADDRESS_TCON)
         return TerminalControl.from_bin(data)
@@ -0,0 +1,153 @@
+"""Heap and garbage collector telemetry
+
+Tracks the free heap's low-water mark, the memory allocated by each iteration
+of a loop, and how long garbage collections take. Collections are meant to be
+run on purpose from idle points in the firmware with `collect()`, so that they
+don't happen at random when the heap runs out, such as while handling input.
+
+Allocation counts rely on `gc.mem_alloc()` and `gc.mem_free()`, which only
+MicroPython provides. Elsewhere, only collections are recorded.
+
+Copyright 2023 Correl Roush
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the “Software”), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so,
+subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import gc
+import utime
+
+from stats import Histogram
+
+MEASURABLE = hasattr(gc, "mem_alloc")
+
+
+class MemoryMonitor:
+    # Largest block size probed for by largest_free_block()
+    PROBE_MAX = 16384
+
+    def __init__(self) -> None:
+        # Bytes allocated per loop iteration, between mark() and measure()
+        self.allocations = Histogram("alloc")
+        # Duration of each collection, in microseconds
+        self.collection_time = Histogram("gc")
+        self.collections = 0
+        self.low_water = self.free()
+        # Largest free block found after the last collection
+        self.largest_block = 0
+        self._mark = 0
+
+    def free(self) -> int:
+        """Return the number of free bytes on the heap."""
+        return gc.mem_free() if MEASURABLE else 0
+
+    def mark(self) -> None:
+        """Start counting allocations, e.g. at the start of a loop iteration."""
+        if MEASURABLE:
+            self._mark = gc.mem_alloc()
+
+    def measure(self) -> None:
+        """Record the bytes allocated since `mark()`.
+
+        If the collector ran in the meantime the count is unknown and nothing
+        is recorded.
+
+        """
+        if not MEASURABLE:
+            return
+        allocated = gc.mem_alloc() - self._mark
+        if allocated >= 0:
+            self.allocations.record(allocated)
+        free = gc.mem_free()
+        if free < self.low_water:
+            self.low_water = free
+
+    def below(self, minimum: int) -> bool:
+        """Return whether fewer than `minimum` bytes are known to be free."""
+        return MEASURABLE and gc.mem_free() < minimum
+
+    def collect(self) -> None:
+        """Run a garbage collection now, recording how long it took, then
+        probe for the largest free block.
+
+        The probe leaves a block of garbage behind, so it is followed by a
+        second collection (also recorded), leaving the heap as clean as the
+        first one did.
+
+        """
+        free = self.free()
+        if free < self.low_water:
+            self.low_water = free
+        self._collect()
+        if MEASURABLE:
+            self.largest_block = self.largest_free_block()
+            self._collect()
+
+    def _collect(self) -> None:
+        start = utime.ticks_us()
+        gc.collect()
+        self.collection_time.since(start)
+        self.collections += 1
+
+    def largest_free_block(self, limit: int = PROBE_MAX) -> int:
+        """Find the size of the largest block up to `limit` bytes that can
+        currently be allocated, rounded down to `limit` divided by a power of
+        two.
+
+        This probes by allocating buffers, halving the size until one fits, so
+        only the block that fits is left on the heap as garbage. The collector
+        is disabled meanwhile, so a failed probe doesn't set off a collection.
+        The result is most accurate right after a collection, and one should
+        be run afterwards to free the block.
+
+        """
+        if not MEASURABLE:
+            return 0
+        enabled = gc.isenabled()
+        gc.disable()
+        size = limit
+        try:
+            while size > 0:
+                try:
+                    block = bytearray(size)
+                except MemoryError:
+                    size //= 2
+                else:
+                    del block
+                    break
+        finally:
+            if enabled:
+                gc.enable()
+        return size
+
+    def summary(self) -> dict:
+        return {
+            "free": self.free(),
+            "low_water": self.low_water,
+            "largest_block": self.largest_block,
+            "alloc": self.allocations.summary(),
+            "gc": self.collection_time.summary(),
+            "collections": self.collections,
+        }
+
+    def reset(self) -> None:
+        """Start a new reporting period."""
+        self.allocations.reset()
+        self.collection_time.reset()
+        self.collections = 0
+        self.low_water = self.free()
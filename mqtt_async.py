@@ -0,0 +1,347 @@
+"""MicroPython uasyncio MQTT client
+
+A minimal MQTT 3.1.1 client (QoS 0 only) that does all of its network I/O
+through uasyncio streams, so a slow or unreachable broker never blocks the
+other tasks. Connections are supervised by `MQTTClient.run()`, which reconnects
+using exponential backoff with jitter, and outgoing messages are buffered in a
+bounded queue that drops the oldest message when full.
+
+Copyright 2023 Correl Roush
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the “Software”), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so,
+subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import random
+import uasyncio
+import usocket
+import utime
+
+CONNECT = 0x10
+CONNACK = 0x20
+PUBLISH = 0x30
+SUBSCRIBE = 0x82
+PINGREQ = 0xC0
+
+
+def encode_length(length: int) -> bytes:
+    """Encode an MQTT variable-length remaining length field."""
+    encoded = bytearray()
+    while True:
+        byte = length & 0x7F
+        length >>= 7
+        if length:
+            byte |= 0x80
+        encoded.append(byte)
+        if not length:
+            return bytes(encoded)
+
+
+def encode_string(value) -> bytes:
+    """Encode a string or bytes as a length-prefixed MQTT string."""
+    if isinstance(value, str):
+        value = value.encode()
+    return bytes([len(value) >> 8, len(value) & 0xFF]) + value
+
+
+def packet(header: int, body: bytes) -> bytes:
+    """Frame a packet body with its fixed header."""
+    return bytes([header]) + encode_length(len(body)) + body
+
+
+def connect_packet(
+    client_id, keepalive: int, will_topic=None, will_message=None, will_retain=False
+) -> bytes:
+    """Build a CONNECT packet for a clean session."""
+    flags = 0b00000010
+    payload = encode_string(client_id)
+    if will_topic:
+        flags |= 0b00000100
+        if will_retain:
+            flags |= 0b00100000
+        payload += encode_string(will_topic) + encode_string(will_message)
+    body = (
+        encode_string(b"MQTT")
+        + bytes([4, flags, keepalive >> 8, keepalive & 0xFF])
+        + payload
+    )
+    return packet(CONNECT, body)
+
+
+def publish_packet(topic, message, retain: bool = False) -> bytes:
+    """Build a QoS 0 PUBLISH packet."""
+    if isinstance(message, str):
+        message = message.encode()
+    return packet(PUBLISH | (0b1 if retain else 0b0), encode_string(topic) + message)
+
+
+def subscribe_packet(packet_id: int, topic) -> bytes:
+    """Build a SUBSCRIBE packet requesting QoS 0."""
+    body = bytes([packet_id >> 8, packet_id & 0xFF]) + encode_string(topic) + b"\x00"
+    return packet(SUBSCRIBE, body)
+
+
+class MQTTClient:
+    """MQTT client running as a uasyncio task."""
+
+    CONNECT_TIMEOUT_MS = 5000
+
+    def __init__(
+        self,
+        client_id,
+        server: str,
+        port: int = 1883,
+        keepalive: int = 60,
+        queue_size: int = 16,
+        backoff_min_ms: int = 1000,
+        backoff_max_ms: int = 60000,
+    ) -> None:
+        self.client_id = client_id
+        self.server = server
+        self.port = port
+        self.keepalive = keepalive
+        self.queue_size = queue_size
+        self.backoff_min_ms = backoff_min_ms
+        self.backoff_max_ms = backoff_max_ms
+
+        self.connected = False
+        self.dropped = 0
+        # Numeric address of the server, once it has been looked up
+        self.address = None
+
+        self._callback = None
+        self._on_connect = None
+        self._will = None
+        self._topics = []
+        self._packet_id = 0
+        self._queue = []
+        self._queued = uasyncio.Event()
+        self._attempts = 0
+        self._last_received = 0
+        self._last_sent = 0
+        # When the last unanswered ping was sent, if any
+        self._ping_sent = None
+        self._reader = None
+        self._writer = None
+
+    def set_callback(self, callback) -> None:
+        """Set the function called with (topic, message) for received messages."""
+        self._callback = callback
+
+    def set_connect_callback(self, callback) -> None:
+        """Set a function called every time a connection is established."""
+        self._on_connect = callback
+
+    def set_last_will(self, topic, message, retain: bool = False) -> None:
+        self._will = (topic, message, retain)
+
+    def subscribe(self, topic) -> None:
+        """Subscribe to a topic on this and every subsequent connection."""
+        self._topics.append(topic)
+        if self.connected:
+            self._enqueue(self._subscribe(topic))
+
+    def publish(self, topic, message, retain: bool = False) -> bool:
+        """Queue a message to be published.
+
+        Returns False if the client is not connected, in which case the message
+        is discarded. If the queue is full, the oldest queued message is dropped
+        to make room.
+
+        """
+        if not self.connected:
+            return False
+        self._enqueue(publish_packet(topic, message, retain))
+        return True
+
+    def _enqueue(self, data: bytes) -> None:
+        if len(self._queue) >= self.queue_size:
+            self._queue.pop(0)
+            self.dropped += 1
+        self._queue.append(data)
+        self._queued.set()
+
+    def _subscribe(self, topic) -> bytes:
+        self._packet_id = self._packet_id % 0xFFFF + 1
+        return subscribe_packet(self._packet_id, topic)
+
+    def resolve(self) -> None:
+        """Look up the server's numeric address, and keep it for connecting.
+
+        The name lookup blocks everything until the name server answers or
+        times out, so it is only done once rather than for every connection
+        attempt. It is done by `run()` if needed, which should be started once
+        the network is up, and a failed lookup is only retried after the
+        maximum backoff delay. Configuring the server by numeric address avoids
+        the lookup altogether.
+
+        """
+        sockaddr = usocket.getaddrinfo(self.server, self.port)[0][-1]
+        # An (address, port) tuple on the ESP32
+        self.address = sockaddr[0]
+
+    def backoff_ms(self) -> int:
+        """Return the delay before the next connection attempt.
+
+        Delays grow exponentially with each failed attempt up to the configured
+        maximum, with random jitter across the upper half of the delay so that
+        many devices don't retry in lockstep.
+
+        """
+        delay = self.backoff_min_ms << min(self._attempts, 16)
+        delay = min(delay, self.backoff_max_ms)
+        jitter = random.getrandbits(16) * (delay // 2) >> 16
+        return delay // 2 + jitter
+
+    async def run(self) -> None:
+        """Keep a connection to the broker open, reconnecting as needed."""
+        while True:
+            try:
+                if self.address is None:
+                    self.resolve()
+                await self._connect()
+                self._attempts = 0
+                await self._session()
+            except (OSError, EOFError, uasyncio.TimeoutError) as e:
+                print(f"MQTT: Connection to {self.server} failed: {e!r}")
+            self._close()
+            if self.address is None:
+                # The lookup failed, after keeping every task waiting
+                delay = self.backoff_max_ms
+            else:
+                delay = self.backoff_ms()
+            self._attempts += 1
+            await uasyncio.sleep_ms(delay)
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await uasyncio.wait_for_ms(
+            uasyncio.open_connection(self.address, self.port),
+            self.CONNECT_TIMEOUT_MS,
+        )
+        will_topic, will_message, will_retain = self._will or (None, None, False)
+        await self._send(
+            connect_packet(
+                self.client_id, self.keepalive, will_topic, will_message, will_retain
+            )
+        )
+        header, body = await uasyncio.wait_for_ms(
+            self._read_packet(), self.CONNECT_TIMEOUT_MS
+        )
+        if header != CONNACK or len(body) != 2 or body[1] != 0:
+            code = body[1] if len(body) >= 2 else None
+            raise OSError(f"connection refused ({code})")
+
+        self.connected = True
+        self._ping_sent = None
+        self._queue.clear()
+        for topic in self._topics:
+            self._enqueue(self._subscribe(topic))
+        if self._on_connect:
+            self._on_connect()
+
+    async def _session(self) -> None:
+        reader = uasyncio.create_task(self._read_loop())
+        try:
+            await self._write_loop(reader)
+        finally:
+            reader.cancel()
+
+    async def _write_loop(self, reader) -> None:
+        interval = self.keepalive * 1000 // 2
+        while True:
+            if reader.done():
+                raise OSError("connection lost")
+            try:
+                await uasyncio.wait_for_ms(self._queued.wait(), interval)
+            except uasyncio.TimeoutError:
+                pass
+            if self._ping_due():
+                self._ping_sent = utime.ticks_ms()
+                await self._send(bytes([PINGREQ, 0]))
+            self._queued.clear()
+            while self._queue:
+                await self._send(self._queue.pop(0))
+
+    def _ping_due(self) -> bool:
+        """Return whether the broker should be pinged.
+
+        A ping is due when nothing has been sent for half the keepalive
+        interval, so the broker doesn't drop the connection, or nothing has
+        been received for a whole one. If nothing at all is received within
+        half the keepalive interval of a ping, the connection is considered
+        lost.
+
+        """
+        now = utime.ticks_ms()
+        interval = self.keepalive * 1000
+        if self._ping_sent is not None:
+            if utime.ticks_diff(self._last_received, self._ping_sent) < 0:
+                if utime.ticks_diff(now, self._ping_sent) >= interval // 2:
+                    raise OSError("keepalive timed out")
+                return False
+            self._ping_sent = None
+        return (
+            utime.ticks_diff(now, self._last_sent) >= interval // 2
+            or utime.ticks_diff(now, self._last_received) >= interval
+        )
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                header, body = await self._read_packet()
+                if header & 0xF0 == PUBLISH and self._callback:
+                    length = body[0] << 8 | body[1]
+                    topic = body[2 : 2 + length]
+                    if header & 0b0110:
+                        # QoS 1/2 messages carry a packet id we don't use
+                        length += 2
+                    self._callback(topic, body[2 + length :])
+        except (OSError, EOFError) as e:
+            print(f"MQTT: Read failed: {e!r}")
+        finally:
+            # Wake the write loop so it notices the connection is gone
+            self._queued.set()
+
+    async def _read_packet(self):
+        header = (await self._reader.readexactly(1))[0]
+        length = 0
+        shift = 0
+        while True:
+            byte = (await self._reader.readexactly(1))[0]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        body = await self._reader.readexactly(length) if length else b""
+        self._last_received = utime.ticks_ms()
+        return header, body
+
+    async def _send(self, data: bytes) -> None:
+        self._writer.write(data)
+        await self._writer.drain()
+        self._last_sent = utime.ticks_ms()
+
+    def _close(self) -> None:
+        self.connected = False
+        if self._writer:
+            try:
+                self._writer.close()
+            except OSError:
+                pass
+        self._reader = None
+        self._writer = None
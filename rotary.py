@@ -8,6 +8,8 @@
 #   https://github.com/MikeTeachman/micropython-rotary
 
 import micropython
+import utime
+from array import array
 
 _DIR_CW = const(0x10)  # Clockwise step
 _DIR_CCW = const(0x20)  # Counter-clockwise step
@@ -22,60 +24,52 @@ _R_CCW_2 = const(0x5)
 _R_CCW_3 = const(0x6)
 _R_ILLEGAL = const(0x7)
 
-_transition_table = [
+# Transition tables are flattened into bytes, indexed by
+# (current state << 2) | CLK/DT, so the interrupt handler does a single
+# lookup without any list indexing.
+_transition_table = bytes((
 
     # |------------- NEXT STATE -------------|            |CURRENT STATE|
     # CLK/DT    CLK/DT     CLK/DT    CLK/DT
     #   00        01         10        11
-    [_R_START, _R_CCW_1, _R_CW_1,  _R_START],             # _R_START
-    [_R_CW_2,  _R_START, _R_CW_1,  _R_START],             # _R_CW_1
-    [_R_CW_2,  _R_CW_3,  _R_CW_1,  _R_START],             # _R_CW_2
-    [_R_CW_2,  _R_CW_3,  _R_START, _R_START | _DIR_CW],   # _R_CW_3
-    [_R_CCW_2, _R_CCW_1, _R_START, _R_START],             # _R_CCW_1
-    [_R_CCW_2, _R_CCW_1, _R_CCW_3, _R_START],             # _R_CCW_2
-    [_R_CCW_2, _R_START, _R_CCW_3, _R_START | _DIR_CCW],  # _R_CCW_3
-    [_R_START, _R_START, _R_START, _R_START]]             # _R_ILLEGAL
-
-_transition_table_half_step = [
-    [_R_CW_3,            _R_CW_2,  _R_CW_1,  _R_START],
-    [_R_CW_3 | _DIR_CCW, _R_START, _R_CW_1,  _R_START],
-    [_R_CW_3 | _DIR_CW,  _R_CW_2,  _R_START, _R_START],
-    [_R_CW_3,            _R_CCW_2, _R_CCW_1, _R_START],
-    [_R_CW_3,            _R_CW_2,  _R_CCW_1, _R_START | _DIR_CW],
-    [_R_CW_3,            _R_CCW_2, _R_CW_3,  _R_START | _DIR_CCW],
-    [_R_START,           _R_START, _R_START, _R_START],
-    [_R_START,           _R_START, _R_START, _R_START]]
+    _R_START, _R_CCW_1, _R_CW_1,  _R_START,               # _R_START
+    _R_CW_2,  _R_START, _R_CW_1,  _R_START,               # _R_CW_1
+    _R_CW_2,  _R_CW_3,  _R_CW_1,  _R_START,               # _R_CW_2
+    _R_CW_2,  _R_CW_3,  _R_START, _R_START | _DIR_CW,     # _R_CW_3
+    _R_CCW_2, _R_CCW_1, _R_START, _R_START,               # _R_CCW_1
+    _R_CCW_2, _R_CCW_1, _R_CCW_3, _R_START,               # _R_CCW_2
+    _R_CCW_2, _R_START, _R_CCW_3, _R_START | _DIR_CCW,    # _R_CCW_3
+    _R_START, _R_START, _R_START, _R_START))              # _R_ILLEGAL
+
+_transition_table_half_step = bytes((
+    _R_CW_3,            _R_CW_2,  _R_CW_1,  _R_START,
+    _R_CW_3 | _DIR_CCW, _R_START, _R_CW_1,  _R_START,
+    _R_CW_3 | _DIR_CW,  _R_CW_2,  _R_START, _R_START,
+    _R_CW_3,            _R_CCW_2, _R_CCW_1, _R_START,
+    _R_CW_3,            _R_CW_2,  _R_CCW_1, _R_START | _DIR_CW,
+    _R_CW_3,            _R_CCW_2, _R_CW_3,  _R_START | _DIR_CCW,
+    _R_START,           _R_START, _R_START, _R_START,
+    _R_START,           _R_START, _R_START, _R_START))
 
 _STATE_MASK = const(0x07)
 _DIR_MASK = const(0x30)
 
+_RANGE_UNBOUNDED = const(1)
+_RANGE_WRAP = const(2)
+_RANGE_BOUNDED = const(3)
 
-def _wrap(value, incr, lower_bound, upper_bound):
-    range = upper_bound - lower_bound + 1
-    value = value + incr
-
-    if value < lower_bound:
-        value += range * ((lower_bound - value) // range + 1)
-
-    return lower_bound + (value - lower_bound) % range
-
-
-def _bound(value, incr, lower_bound, upper_bound):
-    return min(upper_bound, max(lower_bound, value + incr))
-
-
-def _trigger(rotary_instance):
-    for listener in rotary_instance._listener:
-        listener()
+_EVENT_BUFFER_SIZE = const(32)
+_ACCEL_STEPS = const(8)
 
 
 class Rotary(object):
 
-    RANGE_UNBOUNDED = const(1)
-    RANGE_WRAP = const(2)
-    RANGE_BOUNDED = const(3)
+    RANGE_UNBOUNDED = _RANGE_UNBOUNDED
+    RANGE_WRAP = _RANGE_WRAP
+    RANGE_BOUNDED = _RANGE_BOUNDED
 
-    def __init__(self, min_val, max_val, incr, reverse, range_mode, half_step, invert):
+    def __init__(self, min_val, max_val, incr, reverse, range_mode, half_step, invert,
+                 accel=None):
         self._min_val = min_val
         self._max_val = max_val
         self._incr = incr
@@ -87,8 +81,53 @@ class Rotary(object):
         self._invert = invert
         self._listener = []
 
+        # Ring buffer of value changes and the ticks_us() time they happened,
+        # written by the interrupt handler and read by read_event().
+        self._event_deltas = array('h', [0] * _EVENT_BUFFER_SIZE)
+        self._event_times = array('L', [0] * _EVENT_BUFFER_SIZE)
+        self._event_head = 0
+        self._event_tail = 0
+        self._event_overflows = 0
+
+        # Listeners are run outside of the interrupt handler, using a bound
+        # method created up front so scheduling it doesn't allocate.
+        self._dispatch_pending = False
+        self._dispatch_ref = self._dispatch
+        self._schedule_overflows = 0
+
+        # Acceleration curve: detents less than accel_intervals[i] microseconds
+        # after the previous one in the same direction step by
+        # accel_multipliers[i] increments.
+        self._accel_intervals = array('L', [0] * _ACCEL_STEPS)
+        self._accel_multipliers = array('H', [0] * _ACCEL_STEPS)
+        self._accel_steps = 0
+        self._last_detent = 0
+        self._last_direction = 0
+        self._set_accel(accel)
+
+    def _set_accel(self, accel):
+        # accel is a sequence of (interval_ms, multiplier) pairs, fastest first
+        accel = sorted(accel or ())
+        if len(accel) > _ACCEL_STEPS:
+            raise ValueError('At most {} acceleration steps'.format(_ACCEL_STEPS))
+        for i, (interval, multiplier) in enumerate(accel):
+            self._accel_intervals[i] = interval * 1000
+            self._accel_multipliers[i] = multiplier
+        self._accel_steps = len(accel)
+        self._last_direction = 0
+
+    def _multiplier(self, interval):
+        # Returns the increment multiplier for a detent `interval` microseconds
+        # after the previous one
+        i = 0
+        while i < self._accel_steps:
+            if interval < self._accel_intervals[i]:
+                return self._accel_multipliers[i]
+            i += 1
+        return 1
+
     def set(self, value=None, min_val=None, incr=None,
-            max_val=None, reverse=None, range_mode=None):
+            max_val=None, reverse=None, range_mode=None, accel=None):
         # disable DT and CLK pin interrupts
         self._hal_disable_irq()
 
@@ -104,6 +143,8 @@ class Rotary(object):
             self._reverse = -1 if reverse else 1
         if range_mode is not None:
             self._range_mode = range_mode
+        if accel is not None:
+            self._set_accel(accel)
         self._state = _R_START
 
         # enable DT and CLK pin interrupts
@@ -125,49 +166,90 @@ class Rotary(object):
         if l not in self._listener:
             raise ValueError('{} is not an installed listener'.format(l))
         self._listener.remove(l)
-        
+
+    def read_event(self):
+        # Returns the oldest unread (delta, ticks_us) value change, or None
+        if self._event_tail == self._event_head:
+            return None
+        tail = self._event_tail
+        event = (self._event_deltas[tail], self._event_times[tail])
+        self._event_tail = (tail + 1) % _EVENT_BUFFER_SIZE
+        return event
+
+    def overflows(self):
+        # Number of value changes dropped because the event buffer was full,
+        # and listener dispatches dropped because the schedule queue was full
+        return self._event_overflows, self._schedule_overflows
+
+    def _dispatch(self, _):
+        self._dispatch_pending = False
+        for listener in self._listener:
+            try:
+                listener()
+            except Exception as e:
+                print('Rotary listener {} failed: {}'.format(listener, e))
+
+    @micropython.native
     def _process_rotary_pins(self, pin):
         old_value = self._value
         clk_dt_pins = (self._hal_get_clk_value() <<
                        1) | self._hal_get_dt_value()
-                       
+
         if self._invert:
             clk_dt_pins = ~clk_dt_pins & 0x03
-            
+
         # Determine next state
+        index = (self._state & _STATE_MASK) << 2 | clk_dt_pins
         if self._half_step:
-            self._state = _transition_table_half_step[self._state &
-                                                      _STATE_MASK][clk_dt_pins]
+            self._state = _transition_table_half_step[index]
         else:
-            self._state = _transition_table[self._state &
-                                            _STATE_MASK][clk_dt_pins]
+            self._state = _transition_table[index]
         direction = self._state & _DIR_MASK
+        if not direction:
+            return
+
+        now = utime.ticks_us()
+        incr = self._incr
+        if self._accel_steps:
+            if direction == self._last_direction:
+                incr *= self._multiplier(utime.ticks_diff(now, self._last_detent))
+            self._last_detent = now
+            self._last_direction = direction
 
-        incr = 0
         if direction == _DIR_CW:
-            incr = self._incr
-        elif direction == _DIR_CCW:
-            incr = -self._incr
-
-        incr *= self._reverse
-
-        if self._range_mode == self.RANGE_WRAP:
-            self._value = _wrap(
-                self._value,
-                incr,
-                self._min_val,
-                self._max_val)
-        elif self._range_mode == self.RANGE_BOUNDED:
-            self._value = _bound(
-                self._value,
-                incr,
-                self._min_val,
-                self._max_val)
+            value = old_value + incr * self._reverse
         else:
-            self._value = self._value + incr
-
-        try:
-            if old_value != self._value and len(self._listener) != 0:
-                _trigger(self)
-        except:
-            pass
+            value = old_value - incr * self._reverse
+
+        range_mode = self._range_mode
+        if range_mode == _RANGE_WRAP:
+            if value > self._max_val or value < self._min_val:
+                value = self._min_val + (value - self._min_val) % (
+                    self._max_val - self._min_val + 1)
+        elif range_mode == _RANGE_BOUNDED:
+            if value > self._max_val:
+                value = self._max_val
+            elif value < self._min_val:
+                value = self._min_val
+        self._value = value
+
+        if value != old_value:
+            self._queue_event(value - old_value, now)
+
+    def _queue_event(self, delta, time):
+        # Record a value change and schedule the listeners to be run
+        head = (self._event_head + 1) % _EVENT_BUFFER_SIZE
+        if head == self._event_tail:
+            self._event_overflows += 1
+        else:
+            self._event_deltas[self._event_head] = delta
+            self._event_times[self._event_head] = time
+            self._event_head = head
+
+        if self._listener and not self._dispatch_pending:
+            self._dispatch_pending = True
+            try:
+                micropython.schedule(self._dispatch_ref, None)
+            except RuntimeError:
+                self._dispatch_pending = False
+                self._schedule_overflows += 1
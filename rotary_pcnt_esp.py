@@ -0,0 +1,98 @@
+# MIT License (MIT)
+# Copyright (c) 2020 Mike Teachman
+# https://opensource.org/licenses/MIT
+
+# Platform-specific MicroPython code for the rotary encoder module
+# ESP32 implementation using the PCNT (pulse counter) peripheral
+
+# Documentation:
+#   https://github.com/MikeTeachman/micropython-rotary
+
+import utime
+from machine import Pin
+from rotary import Rotary
+
+
+class RotaryPCNT(Rotary):
+    # Quadrature is decoded and counted by the PCNT peripheral (through
+    # machine.Encoder), so turning the encoder doesn't interrupt the CPU at
+    # all. The count is only read, and converted into steps, when the value
+    # or events are requested.
+
+    def __init__(self, pin_num_clk, pin_num_dt, min_val=0, max_val=10, incr=1,
+                 reverse=False, range_mode=Rotary.RANGE_UNBOUNDED, pull_up=False,
+                 half_step=False, invert=False, accel=None, unit=0, filter_ns=1000,
+                 counter=None):
+
+        super().__init__(min_val, max_val, incr, reverse, range_mode, half_step, invert,
+                         accel)
+
+        if pull_up == True:
+            self._pin_clk = Pin(pin_num_clk, Pin.IN, Pin.PULL_UP)
+            self._pin_dt = Pin(pin_num_dt, Pin.IN, Pin.PULL_UP)
+        else:
+            self._pin_clk = Pin(pin_num_clk, Pin.IN)
+            self._pin_dt = Pin(pin_num_dt, Pin.IN)
+
+        if counter is None:
+            from machine import Encoder
+            counter = Encoder(unit, self._pin_clk, self._pin_dt,
+                              phases=4, filter_ns=filter_ns)
+        self._counter = counter
+        # Quadrature edges per detent
+        self._counts_per_step = 2 if half_step else 4
+        self._count = self._counter.value()
+
+    def value(self):
+        self._poll()
+        return self._value
+
+    def read_event(self):
+        self._poll()
+        return super().read_event()
+
+    def _poll(self):
+        # Apply every full step counted since the last poll
+        count = self._counter.value()
+        diff = count - self._count
+        if diff >= 0:
+            steps = diff // self._counts_per_step
+        else:
+            steps = -(-diff // self._counts_per_step)
+        if not steps:
+            return
+        self._count += steps * self._counts_per_step
+
+        # Without an interrupt per detent, acceleration uses the average time
+        # between the detents counted since the last poll
+        now = utime.ticks_us()
+        incr = self._incr
+        if self._accel_steps:
+            direction = 1 if steps > 0 else -1
+            if direction == self._last_direction:
+                interval = utime.ticks_diff(now, self._last_detent) // abs(steps)
+                incr *= self._multiplier(interval)
+            self._last_detent = now
+            self._last_direction = direction
+
+        old_value = self._value
+        value = old_value + steps * incr * self._reverse
+        if self._range_mode == Rotary.RANGE_WRAP:
+            value = self._min_val + (value - self._min_val) % (
+                self._max_val - self._min_val + 1)
+        elif self._range_mode == Rotary.RANGE_BOUNDED:
+            value = min(self._max_val, max(self._min_val, value))
+        self._value = value
+
+        if value != old_value:
+            self._queue_event(value - old_value, now)
+
+    def _hal_enable_irq(self):
+        # Steps counted before the value was set are discarded
+        self._count = self._counter.value()
+
+    def _hal_disable_irq(self):
+        pass
+
+    def _hal_close(self):
+        self._counter.deinit()
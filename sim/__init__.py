@@ -0,0 +1,23 @@
+"""Host-side support for running the firmware under CPython.
+
+The firmware imports modules that only exist on MicroPython (`machine`,
+`micropython`, ...). Calling `install()` puts fake implementations of them,
+found in the `modules` directory, on the import path so the drivers can be
+exercised and benchmarked on a development machine, and `run_main` runs the
+whole firmware against simulated hardware.
+
+"""
+
+import builtins
+import os
+import sys
+
+MODULES = os.path.join(os.path.dirname(__file__), "modules")
+
+
+def install() -> None:
+    """Make the fake MicroPython modules importable."""
+    if not hasattr(builtins, "const"):
+        builtins.const = lambda value: value
+    if MODULES not in sys.path:
+        sys.path.insert(0, MODULES)
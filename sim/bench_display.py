@@ -0,0 +1,116 @@
+"""Measure how much flushing the display delays other tasks.
+
+Run from the repository root with `python -m sim.bench_display`, or on an
+ESP32 with the display attached with `mpremote run sim/bench_display.py`. A
+ticker task sleeps for TICK_MS at a time, like the input task polling the
+encoder, while the whole display is redrawn at the firmware's frame rate. How
+late the ticker wakes (its jitter) is reported for each way of flushing the
+display, along with the number of frames drawn.
+
+Under CPython the emulated display's bus time advances the virtual clock, as
+the transfer would keep the CPU busy on the device. A worker thread can't run
+against the virtual clock, so it is only measured on the device.
+
+"""
+
+import sys
+
+SIMULATED = sys.implementation.name != "micropython"
+
+if SIMULATED:
+    import sim
+
+    sim.install()
+
+import machine
+import uasyncio
+import utime
+
+import ssd1306
+from display import Display
+from stats import Histogram
+
+DURATION_MS = 5000
+TICK_MS = 10
+FPS = 15
+OLED_ADDRESS = 0x3C
+OLED_I2C_HZ = 400000
+
+
+def make_oled():
+    if SIMULATED:
+        from sim import chips
+
+        utime.freeze()
+        device = chips.SSD1306(clock_hz=OLED_I2C_HZ, advance_clock=True)
+        machine.attach_i2c(22, OLED_ADDRESS, device)
+        i2c = machine.SoftI2C(sda=machine.Pin(21), scl=machine.Pin(22))
+    else:
+        # The hardware I2C driver lets other threads run during transfers
+        i2c = machine.I2C(0, sda=machine.Pin(21), scl=machine.Pin(22), freq=OLED_I2C_HZ)
+    return ssd1306.SSD1306_I2C(128, 32, i2c)
+
+
+async def ticker(jitter: Histogram) -> None:
+    while True:
+        start = utime.ticks_us()
+        await uasyncio.sleep_ms(TICK_MS)
+        late = utime.ticks_diff(utime.ticks_us(), start) - TICK_MS * 1000
+        jitter.record(max(0, late))
+
+
+async def redraw(display: Display) -> None:
+    while True:
+        display.request()
+        await uasyncio.sleep_ms(5)
+
+
+async def measure(oled, flush: str) -> tuple:
+    frame = [0]
+
+    def render():
+        # Change every byte of the display, for the longest possible flush
+        frame[0] += 1
+        oled.fill(frame[0] & 1)
+        return 0, 0, oled.width, oled.height
+
+    display = Display(oled, render, fps=FPS, flush=flush)
+    jitter = Histogram(flush)
+    tasks = [
+        uasyncio.create_task(display.run()),
+        uasyncio.create_task(ticker(jitter)),
+        uasyncio.create_task(redraw(display)),
+    ]
+    await uasyncio.sleep_ms(DURATION_MS)
+    for task in tasks:
+        task.cancel()
+    await uasyncio.sleep_ms(0)
+    return jitter, display
+
+
+def main():
+    oled = make_oled()
+    modes = [Display.FLUSH_SYNC, Display.FLUSH_PAGED]
+    if SIMULATED:
+        print("Simulated, skipping the flush worker")
+    else:
+        modes.append(Display.FLUSH_THREAD)
+    row = "{:<8} {:>8} {:>10} {:>10} {:>10} {:>10}"
+    print(row.format("flush", "frames", "flush us", "jitter us", "p99 us", "max us"))
+    for flush in modes:
+        jitter, display = uasyncio.run(measure(oled, flush))
+        print(
+            row.format(
+                flush,
+                display.frames,
+                display.flush_time.mean,
+                jitter.mean,
+                jitter.p99,
+                jitter.max,
+            )
+        )
+        uasyncio.new_event_loop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Count heap allocations made by the MCP4 driver's command path.
+
+Run from the repository root with `python -m sim.bench_mcp4`. Each operation
+is run many times and the number of bytes allocated per call is reported; all
+of them should be zero.
+
+Under MicroPython (e.g. the unix port) allocations are measured using
+`gc.mem_alloc()` with the collector disabled, and under CPython using the
+`tracemalloc` peak, so short-lived allocations are counted as well.
+
+"""
+
+import gc
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+if sys.implementation.name != "micropython":
+    import sim
+
+    sim.install()
+
+import mcp4
+
+ITERATIONS = 1000
+
+
+class LoopbackSPI:
+    """Answers every command with a valid status byte and data 0x80.
+
+    Values are kept below 257 so that CPython doesn't allocate int objects,
+    which MicroPython stores inline as small ints.
+
+    """
+
+    def write_readinto(self, write_buf, read_buf):
+        i = 0
+        while i < len(read_buf):
+            read_buf[i] = 0x80 if i & 1 else 0xFE
+            i += 1
+
+
+def cs(value):
+    pass
+
+
+def measure(operation) -> float:
+    """Return the average number of bytes allocated around each call."""
+    operation()
+    if hasattr(gc, "mem_alloc"):
+        gc.collect()
+        gc.disable()
+        before = gc.mem_alloc()
+        for _ in range(ITERATIONS):
+            operation()
+        after = gc.mem_alloc()
+        gc.enable()
+        return (after - before) / ITERATIONS
+
+    # CPython: measure the peak usage above the baseline of every single call
+    tracemalloc.start()
+    total = 0
+    for _ in range(ITERATIONS):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - baseline
+    tracemalloc.stop()
+    return total / ITERATIONS
+
+
+def allocated(operation) -> float:
+    """Return the average number of bytes allocated by each operation call,
+    excluding the overhead of the measurement itself."""
+    return measure(operation) - measure(lambda: None)
+
+
+def main():
+    pot = mcp4.MCP4(LoopbackSPI(), cs)
+    volumes = [64, 64]
+    operations = [
+        ("read (cached)", lambda: pot.read(0)),
+        ("read (uncached)", lambda: pot.read(0, cached=False)),
+        ("write", lambda: pot.write(1, 64)),
+        ("increment", lambda: pot.increment(0)),
+        ("decrement", lambda: pot.decrement(0)),
+        ("write_many", lambda: pot.write_many(volumes)),
+    ]
+    # The first measurement includes one-off allocations of the tracer itself
+    measure(lambda: None)
+    failed = False
+    for name, operation in operations:
+        size = allocated(operation)
+        failed = failed or size > 0
+        print("{:<16} {:>8.1f} bytes/call".format(name, size))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark the rotary encoder decoder with synthetic edge sequences.
+
+Run from the repository root with `python -m sim.bench_rotary [EDGES]`. A
+random mix of clockwise and counter-clockwise detents, some with contact
+bounce, is fed through the interrupt handler. The decoded value is checked
+against the number of detents generated, so missed or extra steps fail the
+benchmark, and the time spent per edge is reported.
+
+"""
+
+import random
+import sys
+import time
+
+import sim
+
+sim.install()
+
+from rotary import Rotary
+
+CW = (0b10, 0b00, 0b01, 0b11)
+CCW = (0b01, 0b00, 0b10, 0b11)
+# A clockwise detent where the first contact bounces before settling
+CW_BOUNCE = (0b10, 0b11, 0b10, 0b00, 0b10, 0b00, 0b01, 0b11)
+CCW_BOUNCE = (0b01, 0b11, 0b01, 0b00, 0b01, 0b00, 0b10, 0b11)
+
+
+class SyntheticRotary(Rotary):
+    def __init__(self):
+        super().__init__(0, 0, 1, False, Rotary.RANGE_UNBOUNDED, False, False)
+        self.pins = 0b11
+
+    def _hal_get_clk_value(self):
+        return self.pins >> 1
+
+    def _hal_get_dt_value(self):
+        return self.pins & 0b1
+
+    def _hal_enable_irq(self):
+        pass
+
+    def _hal_disable_irq(self):
+        pass
+
+
+def generate(edges: int, seed: int = 0):
+    """Return a list of pin states and the net number of detents in it."""
+    rng = random.Random(seed)
+    sequences = [(CW, 1), (CCW, -1), (CW_BOUNCE, 1), (CCW_BOUNCE, -1)]
+    states = []
+    detents = 0
+    while len(states) < edges:
+        sequence, direction = rng.choice(sequences)
+        states.extend(sequence)
+        detents += direction
+    return states, detents
+
+
+def main():
+    edges = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    states, detents = generate(edges)
+    rotary = SyntheticRotary()
+    process = rotary._process_rotary_pins
+    start = time.perf_counter()
+    for pins in states:
+        rotary.pins = pins
+        process(None)
+        # Keep the event buffer drained, as the input task would
+        rotary._event_tail = rotary._event_head
+    elapsed = time.perf_counter() - start
+
+    print("edges:      {}".format(len(states)))
+    print("detents:    {} expected, {} decoded".format(detents, rotary.value()))
+    print("time:       {:.3f} s".format(elapsed))
+    print("per edge:   {:.3f} us".format(elapsed / len(states) * 1000000))
+    if rotary.value() != detents:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""In-process MQTT broker stand-in for the simulator.
+
+Accepts connections made with the fake `uasyncio.open_connection()`, and
+speaks enough MQTT 3.1.1 (QoS 0, `#` and `+` wildcards, retained messages) for
+the firmware's client. Everything published is recorded, and messages can be
+sent to the device with `publish()`.
+
+"""
+
+import uasyncio
+import usocket
+
+from mqtt_async import CONNACK, CONNECT, PINGREQ, PUBLISH, SUBSCRIBE, packet
+from mqtt_async import publish_packet
+
+SUBACK = 0x90
+PINGRESP = 0xD0
+DISCONNECT = 0xE0
+
+
+def matches(pattern: str, topic: str) -> bool:
+    """Return whether a topic matches a subscription pattern."""
+    pattern_levels = pattern.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(pattern_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels) or level not in ("+", topic_levels[i]):
+            return False
+    return len(pattern_levels) == len(topic_levels)
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, (bytes, bytearray)) else value
+
+
+class Session:
+    def __init__(self, writer):
+        self.writer = writer
+        self.client_id = None
+        self.subscriptions = []
+
+    def send(self, data: bytes) -> None:
+        try:
+            self.writer.write(data)
+        except OSError:
+            pass
+
+
+class Broker:
+    def __init__(self, host: str, port: int = 1883, address: str = "192.0.2.1"):
+        self.host = host
+        self.port = port
+        self.address = address
+        self.sessions = []
+        self.published = []
+        self.retained = {}
+        self.connections = 0
+        self.bytes_received = 0
+
+    async def start(self) -> None:
+        """Listen on the broker's address, and make its host name resolve to
+        it."""
+        usocket.add_host(self.host, self.address)
+        await uasyncio.start_server(self._handle, self.address, self.port)
+
+    def publish(self, topic, message, retain: bool = False) -> None:
+        """Publish a message to the connected clients."""
+        topic = _text(topic)
+        message = message.encode() if isinstance(message, str) else message
+        if retain:
+            self.retained[topic] = message
+        for session in self.sessions:
+            if any(matches(pattern, topic) for pattern in session.subscriptions):
+                session.send(publish_packet(topic, message))
+
+    def messages(self, topic) -> list:
+        """Return the payloads published by clients to a topic, oldest first."""
+        return [message for t, message, _ in self.published if t == _text(topic)]
+
+    async def _handle(self, reader, writer) -> None:
+        session = Session(writer)
+        self.sessions.append(session)
+        try:
+            while True:
+                header, body = await self._read_packet(reader)
+                kind = header & 0xF0
+                if header == CONNECT:
+                    self.connections += 1
+                    session.send(bytes([CONNACK, 2, 0, 0]))
+                elif kind == PUBLISH:
+                    length = body[0] << 8 | body[1]
+                    topic = body[2 : 2 + length].decode()
+                    message = body[2 + length :]
+                    self.published.append((topic, message, bool(header & 1)))
+                    self.publish(topic, message, retain=bool(header & 1))
+                elif header == SUBSCRIBE:
+                    self._subscribe(session, body)
+                elif header == PINGREQ:
+                    session.send(bytes([PINGRESP, 0]))
+                elif header == DISCONNECT:
+                    break
+        except EOFError:
+            pass
+        finally:
+            self.sessions.remove(session)
+            writer.close()
+
+    def _subscribe(self, session, body) -> None:
+        granted = bytearray(body[:2])
+        offset = 2
+        while offset < len(body):
+            length = body[offset] << 8 | body[offset + 1]
+            pattern = body[offset + 2 : offset + 2 + length].decode()
+            offset += 2 + length + 1
+            session.subscriptions.append(pattern)
+            granted.append(0)
+        session.send(packet(SUBACK, bytes(granted)))
+        for topic, message in self.retained.items():
+            if any(matches(pattern, topic) for pattern in session.subscriptions):
+                session.send(publish_packet(topic, message, retain=True))
+
+    async def _read_packet(self, reader):
+        header = (await reader.readexactly(1))[0]
+        length = 0
+        shift = 0
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        body = await reader.readexactly(length) if length else b""
+        self.bytes_received += 2 + length
+        return header, body
@@ -0,0 +1,318 @@
+"""Behavioural emulators of the devices attached to the firmware's buses.
+
+Each emulator is attached to a fake bus with `machine.attach_spi()` or
+`machine.attach_i2c()`, or watches the pins it is wired to, and models the
+registers of the real chip closely enough to catch driver bugs.
+
+Every emulator counts the transactions and bytes it receives, and estimates
+the time they occupy the bus at the configured clock. With `advance_clock`
+set, the `utime` clock is moved forward by that time, so that under the
+simulator the cost of bus traffic shows up in the timing of the firmware.
+
+"""
+
+import machine
+import utime
+
+
+class Device:
+    # Bus clock cycles spent on each byte, and on each transaction besides its
+    # bytes (e.g. addressing and start/stop conditions)
+    CYCLES_PER_BYTE = 8
+    CYCLES_PER_TRANSACTION = 0
+
+    def __init__(self, clock_hz: int, advance_clock: bool = False):
+        self.clock_hz = clock_hz
+        self.advance_clock = advance_clock
+        self.transactions = 0
+        self.bytes = 0
+        self.bus_time_us = 0.0
+
+    def _count(self, data) -> None:
+        cycles = self.CYCLES_PER_TRANSACTION + self.CYCLES_PER_BYTE * len(data)
+        elapsed = cycles * 1000000 / self.clock_hz
+        self.transactions += 1
+        self.bytes += len(data)
+        self.bus_time_us += elapsed
+        if self.advance_clock:
+            utime.advance_us(round(elapsed))
+
+    def reset_counters(self) -> None:
+        self.transactions = 0
+        self.bytes = 0
+        self.bus_time_us = 0.0
+
+
+class MCP4(Device):
+    """MCP413X/415X/423X/425X volatile digital potentiometer on SPI.
+
+    Implements the volatile wiper registers, TCON and STATUS. The first byte
+    clocked out for every command is all ones, with the CMDERR bit (bit 1)
+    cleared if the command is invalid. After an invalid command the device
+    drives SDO low and ignores everything until CS is raised.
+
+    """
+
+    ADDRESS_WIPER_0 = 0x00
+    ADDRESS_WIPER_1 = 0x01
+    ADDRESS_TCON = 0x04
+    ADDRESS_STATUS = 0x05
+
+    CMD_WRITE = 0b00
+    CMD_INCREMENT = 0b01
+    CMD_DECREMENT = 0b10
+    CMD_READ = 0b11
+
+    # One cycle between CS falling and the first clock edge
+    CYCLES_PER_TRANSACTION = 1
+
+    def __init__(
+        self,
+        wiper_max: int = 0x80,
+        clock_hz: int = 1000000,
+        advance_clock: bool = False,
+    ):
+        super().__init__(clock_hz, advance_clock)
+        self.wiper_max = wiper_max
+        # Power-on reset values: wipers at mid scale, all terminals connected
+        self.registers = {
+            self.ADDRESS_WIPER_0: wiper_max // 2,
+            self.ADDRESS_WIPER_1: wiper_max // 2,
+            self.ADDRESS_TCON: 0x1FF,
+            self.ADDRESS_STATUS: 0x1F0,
+        }
+        self.errors = 0
+        self._error = False
+
+    @property
+    def wipers(self) -> list:
+        return [
+            self.registers[self.ADDRESS_WIPER_0],
+            self.registers[self.ADDRESS_WIPER_1],
+        ]
+
+    def shutdown(self, value: bool = True) -> None:
+        """Set the state of the hardware shutdown (SHDN) pin."""
+        status = self.registers[self.ADDRESS_STATUS] & ~0b10
+        self.registers[self.ADDRESS_STATUS] = status | (0b10 if value else 0)
+
+    def deselect(self) -> None:
+        """Called when CS is raised, ending the command sequence."""
+        self._error = False
+
+    def transfer(self, data: bytes) -> bytes:
+        self._count(data)
+        output = bytearray(len(data))
+        offset = 0
+        while offset < len(data) and not self._error:
+            address = data[offset] >> 4
+            command = data[offset] >> 2 & 0b11
+            length = 2 if command in (self.CMD_WRITE, self.CMD_READ) else 1
+            if offset + length > len(data) or not self._valid(address, command):
+                # Everything from the error on reads back as zeros
+                self._error = True
+                self.errors += 1
+                output[offset] = 0b11111100
+                break
+            value = self.registers[address]
+            if command == self.CMD_WRITE:
+                self._write(address, (data[offset] & 0b11) << 8 | data[offset + 1])
+                output[offset] = 0xFF
+                output[offset + 1] = 0xFF
+            elif command == self.CMD_READ:
+                output[offset] = 0b11111110 | value >> 8 & 1
+                output[offset + 1] = value & 0xFF
+            else:
+                if command == self.CMD_INCREMENT and value < self.wiper_max:
+                    self.registers[address] = value + 1
+                elif command == self.CMD_DECREMENT and value > 0:
+                    self.registers[address] = value - 1
+                output[offset] = 0xFF
+            offset += length
+        return bytes(output)
+
+    def _valid(self, address: int, command: int) -> bool:
+        if address not in self.registers:
+            return False
+        if command in (self.CMD_INCREMENT, self.CMD_DECREMENT):
+            return address in (self.ADDRESS_WIPER_0, self.ADDRESS_WIPER_1)
+        if command == self.CMD_WRITE:
+            return address != self.ADDRESS_STATUS
+        return True
+
+    def _write(self, address: int, value: int) -> None:
+        if address == self.ADDRESS_TCON:
+            # Bit 8 is reserved and always reads as 1
+            self.registers[address] = value | 0x100
+        else:
+            # Values past full scale select full scale
+            self.registers[address] = min(value, self.wiper_max)
+
+
+class SSD1306(Device):
+    """SSD1306 OLED display controller on I2C.
+
+    Decodes the control bytes and command stream of every write, and keeps the
+    128x64 display RAM (GDDRAM) as pages of vertical bytes, updated according
+    to the addressing mode and column/page windows.
+
+    """
+
+    # An address byte, plus a start and stop condition, and an
+    # acknowledgement after every byte
+    CYCLES_PER_BYTE = 9
+    CYCLES_PER_TRANSACTION = 9 + 2
+
+    COLUMNS = 128
+    PAGES = 8
+
+    # Number of argument bytes following each command taking any
+    _ARGUMENTS = {
+        0x20: 1,  # memory addressing mode
+        0x21: 2,  # column address window
+        0x22: 2,  # page address window
+        0x26: 6,  # horizontal scroll setup
+        0x27: 6,
+        0x29: 5,  # vertical and horizontal scroll setup
+        0x2A: 5,
+        0x81: 1,  # contrast
+        0x8D: 1,  # charge pump
+        0xA3: 2,  # vertical scroll area
+        0xA8: 1,  # multiplex ratio
+        0xD3: 1,  # display offset
+        0xD5: 1,  # clock divide ratio
+        0xD9: 1,  # pre-charge period
+        0xDA: 1,  # COM pins configuration
+        0xDB: 1,  # VCOMH deselect level
+    }
+
+    def __init__(self, clock_hz: int = 400000, advance_clock: bool = False):
+        super().__init__(clock_hz, advance_clock)
+        self.ram = bytearray(self.COLUMNS * self.PAGES)
+        self.on = False
+        self.inverted = False
+        self.contrast = 0x7F
+        self.addressing_mode = 0b10
+        self.column_window = (0, self.COLUMNS - 1)
+        self.page_window = (0, self.PAGES - 1)
+        self.column = 0
+        self.page = 0
+        self.commands = 0
+        self.data_bytes = 0
+        self._command = []
+
+    def write(self, data: bytes) -> None:
+        self._count(data)
+        offset = 0
+        while offset < len(data):
+            control = data[offset]
+            continuation = not control & 0x80
+            is_data = control & 0x40
+            if continuation:
+                # The rest of the transaction follows a single control byte
+                payload = data[offset + 1 :]
+                offset = len(data)
+            else:
+                payload = data[offset + 1 : offset + 2]
+                offset += 2
+            for byte in payload:
+                if is_data:
+                    self._data(byte)
+                else:
+                    self._command_byte(byte)
+
+    def pixel(self, x: int, y: int) -> int:
+        """Return a pixel of the display RAM."""
+        return self.ram[(y >> 3) * self.COLUMNS + x] >> (y & 7) & 1
+
+    def _command_byte(self, byte: int) -> None:
+        self._command.append(byte)
+        if len(self._command) <= self._ARGUMENTS.get(self._command[0], 0):
+            return
+        command, arguments = self._command[0], self._command[1:]
+        self._command = []
+        self.commands += 1
+        if command == 0x20:
+            self.addressing_mode = arguments[0] & 0b11
+        elif command == 0x21:
+            self.column_window = (arguments[0] & 0x7F, arguments[1] & 0x7F)
+            self.column = self.column_window[0]
+        elif command == 0x22:
+            self.page_window = (arguments[0] & 0x07, arguments[1] & 0x07)
+            self.page = self.page_window[0]
+        elif command == 0x81:
+            self.contrast = arguments[0]
+        elif command in (0xA6, 0xA7):
+            self.inverted = bool(command & 1)
+        elif command in (0xAE, 0xAF):
+            self.on = bool(command & 1)
+        elif command < 0x10 and self.addressing_mode == 0b10:
+            self.column = self.column & 0xF0 | command
+        elif command < 0x20 and self.addressing_mode == 0b10:
+            self.column = (command & 0x07) << 4 | self.column & 0x0F
+        elif 0xB0 <= command <= 0xB7 and self.addressing_mode == 0b10:
+            self.page = command & 0x07
+
+    def _data(self, byte: int) -> None:
+        self.data_bytes += 1
+        self.ram[self.page * self.COLUMNS + self.column] = byte
+        first_column, last_column = self.column_window
+        first_page, last_page = self.page_window
+        if self.addressing_mode == 0b00:
+            # Horizontal: along the page, then on to the next page
+            if self.column < last_column:
+                self.column += 1
+            else:
+                self.column = first_column
+                self.page = self.page + 1 if self.page < last_page else first_page
+        elif self.addressing_mode == 0b01:
+            # Vertical: down the column, then on to the next column
+            if self.page < last_page:
+                self.page += 1
+            else:
+                self.page = first_page
+                self.column = (
+                    self.column + 1 if self.column < last_column else first_column
+                )
+        else:
+            # Page: along the page, wrapping around within it
+            self.column = (self.column + 1) % self.COLUMNS
+
+
+class CD4052(Device):
+    """CD4052 dual 4-channel analog multiplexer, driven by GPIO pins.
+
+    Watches the A and B channel select pins and the INH (inhibit) pin. Every
+    pin change is counted as a transaction, and switching channels while not
+    inhibited, which makes an audible click, is counted separately.
+
+    """
+
+    # Pins are written directly rather than clocked over a bus
+    CYCLES_PER_BYTE = 0
+    CYCLES_PER_TRANSACTION = 1
+
+    def __init__(self, a, b, inh, clock_hz: int = 1000000):
+        super().__init__(clock_hz)
+        self._pins = (a, b, inh)
+        self.channel = machine.level(a) | machine.level(b) << 1
+        self.inhibited = bool(machine.level(inh))
+        self.switches = 0
+        self.unmuted_switches = 0
+        machine.watch(a, self._select)
+        machine.watch(b, self._select)
+        machine.watch(inh, self._inhibit)
+
+    def _select(self, level: int) -> None:
+        self._count(b"")
+        a, b, _ = self._pins
+        channel = machine.level(a) | machine.level(b) << 1
+        if channel != self.channel:
+            self.channel = channel
+            self.switches += 1
+            if not self.inhibited:
+                self.unmuted_switches += 1
+
+    def _inhibit(self, level: int) -> None:
+        self._count(b"")
+        self.inhibited = bool(level)
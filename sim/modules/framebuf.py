@@ -0,0 +1,145 @@
+"""Fake framebuf module for running the firmware under CPython.
+
+Only the MONO_VLSB format used by the SSD1306 driver is supported. Text is
+drawn with a stand-in pattern rather than the real 8x8 font, which is enough
+to exercise and measure the display code.
+
+"""
+
+MONO_VLSB = 0
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format=MONO_VLSB, stride=None):
+        if format != MONO_VLSB:
+            raise ValueError("only MONO_VLSB is supported")
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+
+    def fill(self, c):
+        self.buffer[:] = (b"\xff" if c else b"\x00") * len(self.buffer)
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        index = (y >> 3) * self.width + x
+        mask = 1 << (y & 7)
+        if c is None:
+            return 1 if self.buffer[index] & mask else 0
+        if c:
+            self.buffer[index] |= mask
+        else:
+            self.buffer[index] &= ~mask & 0xFF
+
+    def fill_rect(self, x, y, w, h, c):
+        x0, x1 = max(x, 0), min(x + w, self.width)
+        y0, y1 = max(y, 0), min(y + h, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        # Update a whole byte (eight rows) of each column at a time
+        for page in range(y0 >> 3, ((y1 - 1) >> 3) + 1):
+            top = max(y0 - page * 8, 0)
+            bottom = min(y1 - page * 8, 8)
+            mask = ((1 << bottom) - 1) & ~((1 << top) - 1)
+            base = page * self.width
+            for index in range(base + x0, base + x1):
+                if c:
+                    self.buffer[index] |= mask
+                else:
+                    self.buffer[index] &= ~mask & 0xFF
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        dx, dy = abs(x2 - x1), -abs(y2 - y1)
+        sx, sy = (1 if x1 < x2 else -1), (1 if y1 < y2 else -1)
+        error = dx + dy
+        while True:
+            self.pixel(x1, y1, c)
+            if x1 == x2 and y1 == y2:
+                return
+            if 2 * error >= dy:
+                error += dy
+                x1 += sx
+            if 2 * error <= dx:
+                error += dx
+                y1 += sy
+
+    def text(self, s, x, y, c=1):
+        for i, char in enumerate(s):
+            code = ord(char)
+            if code == 32:
+                continue
+            for column in range(8):
+                bits = (code * (column + 3)) & 0x7E
+                for row in range(8):
+                    if bits >> row & 1:
+                        self.pixel(x + i * 8 + column, y + row, c)
+
+    def scroll(self, xstep, ystep):
+        pixels = [
+            [self.pixel(x, y) for x in range(self.width)] for y in range(self.height)
+        ]
+        for y in range(self.height):
+            for x in range(self.width):
+                sx, sy = x - xstep, y - ystep
+                if 0 <= sx < self.width and 0 <= sy < self.height:
+                    self.pixel(x, y, pixels[sy][sx])
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if palette is None and key in (-1, 0):
+            self._blit_columns(fbuf, x, y, key)
+            return
+        for sy in range(fbuf.height):
+            for sx in range(fbuf.width):
+                c = fbuf.pixel(sx, sy)
+                if palette is not None:
+                    c = palette.pixel(c, 0)
+                if c != key:
+                    self.pixel(x + sx, y + sy, c)
+
+
+    def _blit_columns(self, fbuf, x, y, key):
+        # Copy (or with key 0, OR in) whole columns at a time, as bit strings
+        rows = (1 << fbuf.height) - 1
+        for sx in range(fbuf.width):
+            dx = x + sx
+            if not 0 <= dx < self.width:
+                continue
+            bits = 0
+            for page in range((fbuf.height + 7) >> 3):
+                bits |= fbuf.buffer[page * fbuf.width + sx] << (8 * page)
+            bits &= rows
+            mask = rows
+            if y >= 0:
+                bits, mask = bits << y, mask << y
+            else:
+                bits, mask = bits >> -y, mask >> -y
+            for page in range((self.height + 7) >> 3):
+                m = (mask >> (8 * page)) & 0xFF
+                if not m:
+                    continue
+                b = (bits >> (8 * page)) & 0xFF
+                index = page * self.width + dx
+                if key == -1:
+                    self.buffer[index] = (self.buffer[index] & ~m & 0xFF) | b
+                else:
+                    self.buffer[index] |= b
+
+
+def FrameBuffer1(buffer, width, height, stride=None):
+    return FrameBuffer(buffer, width, height, MONO_VLSB, stride)
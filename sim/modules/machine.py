@@ -0,0 +1,200 @@
+"""Fake machine module for running the firmware under CPython.
+
+Pins with the same id share their state, so a test or the simulator can drive
+input edges with `drive()` (running any interrupt handler, as the hardware
+would) and observe outputs with `level()`. Emulated devices can be attached to
+the SPI and I2C buses with `attach_spi()` and `attach_i2c()`; every bus keeps
+count of the transactions and bytes sent over it.
+
+"""
+
+import errno
+
+
+class _Line:
+    def __init__(self):
+        self.value = 0
+        self.handler = None
+        self.trigger = 0
+        self.watchers = []
+
+
+_lines = {}
+_spi_devices = {}
+_i2c_devices = {}
+buses = []
+
+
+def _line(id):
+    if id not in _lines:
+        _lines[id] = _Line()
+    return _lines[id]
+
+
+def reset() -> None:
+    """Forget all pin states, attached devices and buses."""
+    _lines.clear()
+    _spi_devices.clear()
+    _i2c_devices.clear()
+    buses.clear()
+
+
+def drive(id, level: int) -> None:
+    """Set an input pin from the outside, running its interrupt handler."""
+    line = _line(id)
+    level = int(bool(level))
+    if level == line.value:
+        return
+    line.value = level
+    trigger = Pin.IRQ_RISING if level else Pin.IRQ_FALLING
+    if line.handler and line.trigger & trigger:
+        line.handler(Pin(id))
+
+
+def level(id) -> int:
+    """Return the level of a pin."""
+    return _line(id).value
+
+
+def watch(id, callback) -> None:
+    """Call `callback(level)` whenever the firmware changes a pin's level."""
+    _line(id).watchers.append(callback)
+
+
+def attach_spi(bus_id, cs, device) -> None:
+    """Attach a device to an SPI bus, selected when pin `cs` is low.
+
+    The device's `transfer(data)` method is called with the bytes of each
+    transaction, and returns the bytes clocked back. If it has a `deselect()`
+    method, that is called whenever `cs` is raised.
+
+    """
+    _spi_devices.setdefault(bus_id, []).append((cs, device))
+    if hasattr(device, "deselect"):
+        watch(cs, lambda level: level and device.deselect())
+
+
+def attach_i2c(scl, addr, device) -> None:
+    """Attach a device to the I2C bus clocked by pin `scl`.
+
+    The device's `write(data)` method is called with the bytes of each write
+    transaction.
+
+    """
+    _i2c_devices[(scl, addr)] = device
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, *, value=None):
+        self.id = id
+        self._line = _line(id)
+        self.init(mode, pull, value=value)
+
+    def init(self, mode=-1, pull=-1, *, value=None):
+        self.mode = mode
+        self.pull = pull
+        if pull == self.PULL_UP:
+            self._line.value = 1
+        if value is not None:
+            self.value(value)
+
+    def value(self, value=None):
+        if value is None:
+            return self._line.value
+        value = int(bool(value))
+        if value != self._line.value:
+            self._line.value = value
+            for watcher in self._line.watchers:
+                watcher(value)
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_RISING | IRQ_FALLING):
+        self._line.handler = handler
+        self._line.trigger = trigger
+
+
+class _Bus:
+    def __init__(self, name):
+        self.name = name
+        self.transactions = 0
+        self.bytes = 0
+        buses.append(self)
+
+    def _count(self, length):
+        self.transactions += 1
+        self.bytes += length
+
+
+class SPI(_Bus):
+    """SPI bus reading back 0xFF unless an attached device is selected."""
+
+    def __init__(self, id, baudrate=1000000, **kwargs):
+        super().__init__(f"SPI({id})")
+        self.id = id
+        self.baudrate = baudrate
+
+    def init(self, baudrate=1000000, **kwargs):
+        self.baudrate = baudrate
+
+    def _transfer(self, data):
+        self._count(len(data))
+        for cs, device in _spi_devices.get(self.id, ()):
+            if not level(cs):
+                return device.transfer(data)
+        return b"\xff" * len(data)
+
+    def write(self, buf):
+        self._transfer(bytes(buf))
+
+    def write_readinto(self, write_buf, read_buf):
+        read_buf[:] = self._transfer(bytes(write_buf))
+
+
+class SoftI2C(_Bus):
+    """I2C bus on which writes to absent devices fail, as on the hardware."""
+
+    def __init__(self, scl, sda, freq=400000, **kwargs):
+        super().__init__(f"SoftI2C({scl.id}, {sda.id})")
+        self.scl = scl
+        self.sda = sda
+        self.freq = freq
+
+    def _device(self, addr):
+        device = _i2c_devices.get((self.scl.id, addr))
+        if device is None:
+            raise OSError(errno.ENODEV)
+        return device
+
+    def writeto(self, addr, buf, stop=True):
+        data = bytes(buf)
+        self._device(addr).write(data)
+        self._count(len(data))
+        return len(data)
+
+    def writevto(self, addr, vector, stop=True):
+        return self.writeto(addr, b"".join(bytes(buf) for buf in vector), stop)
+
+
+def unique_id():
+    return b"\xde\xad\xbe\xef\x00\x01"
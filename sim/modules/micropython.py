@@ -0,0 +1,18 @@
+"""Fake micropython module for running the firmware under CPython."""
+
+
+def const(value):
+    return value
+
+
+def native(function):
+    return function
+
+
+def viper(function):
+    return function
+
+
+def schedule(function, argument):
+    function(argument)
+    return True
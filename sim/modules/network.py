@@ -0,0 +1,66 @@
+"""Fake network module for running the firmware under CPython.
+
+The station interface connects to any network `CONNECT_DELAY_MS` after
+`connect()` is called, measured with `utime` so it follows the simulator's
+virtual clock. `WLAN.disconnect()` can be used to simulate losing the link.
+
+"""
+
+import utime
+
+STA_IF = 0
+AP_IF = 1
+
+CONNECT_DELAY_MS = 500
+IP_ADDRESS = "192.168.1.50"
+
+_interfaces = {}
+
+
+class WLAN:
+    def __new__(cls, interface_id=STA_IF):
+        # Like the hardware, there is only one object per interface
+        if interface_id not in _interfaces:
+            wlan = super().__new__(cls)
+            wlan._active = False
+            wlan._ssid = None
+            wlan._connect_at = None
+            _interfaces[interface_id] = wlan
+        return _interfaces[interface_id]
+
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = bool(is_active)
+        if not self._active:
+            self.disconnect()
+
+    def connect(self, ssid=None, key=None):
+        if not self._active:
+            raise OSError("WiFi Internal Error")
+        self._ssid = ssid
+        self._connect_at = utime.ticks_add(utime.ticks_ms(), CONNECT_DELAY_MS)
+
+    def disconnect(self):
+        self._connect_at = None
+
+    def isconnected(self):
+        return (
+            self._connect_at is not None
+            and utime.ticks_diff(utime.ticks_ms(), self._connect_at) >= 0
+        )
+
+    def ifconfig(self):
+        if not self.isconnected():
+            return ("0.0.0.0", "0.0.0.0", "0.0.0.0", "0.0.0.0")
+        return (IP_ADDRESS, "255.255.255.0", "192.168.1.1", "192.168.1.1")
+
+    def config(self, name):
+        if name == "ssid":
+            return self._ssid
+        raise ValueError("unknown config param")
+
+
+def reset() -> None:
+    """Forget the state of every interface."""
+    _interfaces.clear()
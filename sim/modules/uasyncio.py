@@ -0,0 +1,405 @@
+"""Fake uasyncio module for running the firmware under CPython.
+
+A small deterministic scheduler implementing the parts of the uasyncio API the
+firmware uses. Tasks run one at a time in the order they became ready, and when
+none are ready the `utime` clock is advanced straight to the next timer, so
+with a frozen clock (see `utime.freeze()`) a run takes no real time and always
+interleaves the same way.
+
+The host CPU time spent in every step of every task, and the clock time that
+passed during it (e.g. while blocked on a simulated bus), are recorded and can
+be retrieved with `stats()`. Streams are in-process pipes: servers started with
+`start_server()` can be reached with `open_connection()`.
+
+"""
+
+import errno
+import heapq
+import time as _time
+from collections import deque
+
+import utime
+
+
+class CancelledError(BaseException):
+    pass
+
+
+class TimeoutError(Exception):
+    pass
+
+
+class _Wait:
+    """Suspends the current task until it is woken through `waiters`, or the
+    timeout expires."""
+
+    def __init__(self, waiters=None, timeout_us=None):
+        self.waiters = waiters
+        self.timeout_us = timeout_us
+
+    def __await__(self):
+        yield self
+
+
+def _wake(waiters) -> None:
+    """Wake every task waiting in a list of waiters."""
+    for task, token in waiters:
+        _loop.wake(task, token)
+    waiters.clear()
+
+
+class TaskStats:
+    def __init__(self, name):
+        self.name = name
+        self.steps = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.max_virtual_us = 0
+
+    def record(self, elapsed_ns, virtual_us):
+        self.steps += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        if virtual_us > self.max_virtual_us:
+            self.max_virtual_us = virtual_us
+
+
+class Task:
+    def __init__(self, coro):
+        self.coro = coro
+        self.name = getattr(coro, "__qualname__", type(coro).__name__)
+        self.data = None
+        self._token = 0
+        self._done = False
+        self._result = None
+        self._exception = None
+        self._waiters = []
+
+    def done(self):
+        return self._done
+
+    def cancel(self):
+        if self._done:
+            return False
+        _loop.schedule(self, exception=CancelledError())
+        return True
+
+    def result(self):
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def _finish(self, result=None, exception=None):
+        self._done = True
+        self._result = result
+        self._exception = exception
+        if (
+            exception is not None
+            and not self._waiters
+            and not isinstance(exception, CancelledError)
+        ):
+            print(f"Task exception wasn't retrieved: {self.name}: {exception!r}")
+        _wake(self._waiters)
+
+    def __await__(self):
+        if not self._done:
+            yield _Wait(self._waiters)
+        return self.result()
+
+
+class _Loop:
+    def __init__(self):
+        self.ready = deque()
+        self.timers = []
+        self.sequence = 0
+        self.stats = {}
+        self.current = None
+
+    def schedule(self, task, value=None, exception=None):
+        # Queuing a task invalidates whatever it was waiting on
+        task._token += 1
+        self.ready.append((task, task._token, value, exception))
+
+    def wake(self, task, token):
+        if task._token == token and not task._done:
+            self.schedule(task)
+
+    def _suspend(self, task, wait):
+        if wait is None:
+            self.schedule(task)
+            return
+        token = task._token
+        if wait.waiters is not None:
+            # Drop waiters that were woken some other way
+            wait.waiters[:] = [w for w in wait.waiters if w[0]._token == w[1]]
+            wait.waiters.append((task, token))
+        if wait.timeout_us is not None:
+            self.sequence += 1
+            heapq.heappush(
+                self.timers,
+                (utime.now_us() + wait.timeout_us, self.sequence, task, token),
+            )
+
+    def _step(self, task, value, exception):
+        self.current = task
+        virtual_start = utime.now_us()
+        start = _time.perf_counter_ns()
+        try:
+            if exception is not None:
+                wait = task.coro.throw(exception)
+            else:
+                wait = task.coro.send(value)
+        except StopIteration as e:
+            task._finish(result=e.value)
+        except BaseException as e:
+            task._finish(exception=e)
+        else:
+            self._suspend(task, wait)
+        elapsed = _time.perf_counter_ns() - start
+        self.current = None
+        if task.name not in self.stats:
+            self.stats[task.name] = TaskStats(task.name)
+        self.stats[task.name].record(elapsed, utime.now_us() - virtual_start)
+
+    def run_until_complete(self, main, until_us=None):
+        while not main.done():
+            if self.ready:
+                task, token, value, exception = self.ready.popleft()
+                if task._token == token and not task._done:
+                    self._step(task, value, exception)
+                continue
+            now = utime.now_us()
+            if not self.timers:
+                if until_us is None:
+                    raise RuntimeError("no tasks can run")
+                utime.sleep_us(until_us - now)
+                return
+            time = self.timers[0][0]
+            if until_us is not None and time > until_us:
+                utime.sleep_us(until_us - now)
+                return
+            if time > now:
+                utime.sleep_us(time - now)
+            while self.timers and self.timers[0][0] <= time:
+                _, _, task, token = heapq.heappop(self.timers)
+                self.wake(task, token)
+
+
+_loop = _Loop()
+_time_limit_us = None
+
+
+def new_event_loop():
+    """Discard all tasks and statistics."""
+    global _loop
+    _loop = _Loop()
+    return _loop
+
+
+def set_time_limit_ms(ms) -> None:
+    """Make `run()` return once `ms` milliseconds of clock time have passed,
+    even if the main task hasn't finished."""
+    global _time_limit_us
+    _time_limit_us = None if ms is None else ms * 1000
+
+
+def stats():
+    """Return the CPU time statistics of every task, by task name."""
+    return _loop.stats
+
+
+def current_task():
+    return _loop.current
+
+
+def create_task(coro):
+    task = Task(coro)
+    _loop.schedule(task)
+    return task
+
+
+def run(coro):
+    task = create_task(coro)
+    until_us = None
+    if _time_limit_us is not None:
+        until_us = utime.now_us() + _time_limit_us
+    _loop.run_until_complete(task, until_us)
+    if task.done():
+        return task.result()
+
+
+async def sleep_ms(t):
+    await _Wait(timeout_us=max(0, int(t)) * 1000)
+
+
+async def sleep(t):
+    await _Wait(timeout_us=max(0, int(t * 1000000)))
+
+
+async def wait_for_ms(aw, timeout):
+    task = aw if isinstance(aw, Task) else create_task(aw)
+    if not task.done():
+        await _Wait(task._waiters, max(0, int(timeout)) * 1000)
+    if not task.done():
+        task.cancel()
+        raise TimeoutError
+    return task.result()
+
+
+async def wait_for(aw, timeout):
+    return await wait_for_ms(aw, timeout * 1000)
+
+
+async def gather(*aws, return_exceptions=False):
+    tasks = [aw if isinstance(aw, Task) else create_task(aw) for aw in aws]
+    results = []
+    for task in tasks:
+        try:
+            results.append(await task)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
+
+
+class Event:
+    def __init__(self):
+        self.state = False
+        self._waiters = []
+
+    def is_set(self):
+        return self.state
+
+    def set(self):
+        self.state = True
+        _wake(self._waiters)
+
+    def clear(self):
+        self.state = False
+
+    async def wait(self):
+        if not self.state:
+            await _Wait(self._waiters)
+        return True
+
+
+class ThreadSafeFlag:
+    def __init__(self):
+        self.state = False
+        self._waiters = []
+
+    def set(self):
+        self.state = True
+        _wake(self._waiters)
+
+    def clear(self):
+        self.state = False
+
+    async def wait(self):
+        if not self.state:
+            await _Wait(self._waiters)
+        self.state = False
+
+
+class _Pipe:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.closed = False
+        self.waiters = []
+
+    def write(self, data):
+        if self.closed:
+            raise OSError(errno.EPIPE)
+        self.buffer += data
+        _wake(self.waiters)
+
+    def close(self):
+        self.closed = True
+        _wake(self.waiters)
+
+
+class Stream:
+    """One end of an in-process connection."""
+
+    def __init__(self, incoming, outgoing):
+        self._in = incoming
+        self._out = outgoing
+
+    async def _fill(self, n):
+        while len(self._in.buffer) < n and not self._in.closed:
+            await _Wait(self._in.waiters)
+
+    async def read(self, n=-1):
+        await self._fill(1)
+        if n < 0:
+            n = len(self._in.buffer)
+        data = bytes(self._in.buffer[:n])
+        del self._in.buffer[:n]
+        return data
+
+    async def readexactly(self, n):
+        await self._fill(n)
+        if len(self._in.buffer) < n:
+            raise EOFError
+        data = bytes(self._in.buffer[:n])
+        del self._in.buffer[:n]
+        return data
+
+    async def readline(self):
+        while b"\n" not in self._in.buffer and not self._in.closed:
+            await _Wait(self._in.waiters)
+        end = self._in.buffer.find(b"\n") + 1 or len(self._in.buffer)
+        data = bytes(self._in.buffer[:end])
+        del self._in.buffer[:end]
+        return data
+
+    def write(self, data):
+        self._out.write(bytes(data))
+
+    async def drain(self):
+        if self._out.closed:
+            raise OSError(errno.ECONNRESET)
+
+    def close(self):
+        self._in.close()
+        self._out.close()
+
+    async def wait_closed(self):
+        pass
+
+
+StreamReader = StreamWriter = Stream
+
+
+class Server:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    def close(self):
+        _servers.pop((self.host, self.port), None)
+
+    async def wait_closed(self):
+        pass
+
+
+_servers = {}
+
+
+async def start_server(callback, host, port, backlog=5):
+    _servers[(host, port)] = callback
+    return Server(host, port)
+
+
+async def open_connection(host, port):
+    callback = _servers.get((host, port))
+    if callback is None:
+        raise OSError(errno.ECONNREFUSED)
+    upstream = _Pipe()
+    downstream = _Pipe()
+    server = Stream(upstream, downstream)
+    create_task(callback(server, server))
+    client = Stream(downstream, upstream)
+    return client, client
@@ -0,0 +1,3 @@
+"""Fake ubinascii module for running the firmware under CPython."""
+
+from binascii import a2b_base64, b2a_base64, hexlify, unhexlify
@@ -0,0 +1,35 @@
+"""Fake usocket module for running the firmware under CPython.
+
+Only name lookups are supported, against a table of simulated hosts filled in
+with `add_host()`. Numeric addresses resolve to themselves, and unknown names
+fail like they do on the ESP32. Connections are made with the fake
+`uasyncio.open_connection()`.
+
+"""
+
+AF_INET = 2
+SOCK_STREAM = 1
+
+# ESP32 (lwIP) error for a failed name lookup
+_EAI_FAIL = -202
+
+_hosts = {}
+
+
+def add_host(name: str, address: str) -> None:
+    _hosts[name] = address
+
+
+def _numeric(host: str) -> bool:
+    parts = host.split(".")
+    return len(parts) == 4 and all(part.isdigit() for part in parts)
+
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+    if _numeric(host):
+        address = host
+    elif host in _hosts:
+        address = _hosts[host]
+    else:
+        raise OSError(_EAI_FAIL)
+    return [(AF_INET, SOCK_STREAM, 0, "", (address, port))]
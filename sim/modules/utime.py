@@ -0,0 +1,70 @@
+"""Fake utime module for running the firmware under CPython.
+
+Time follows the host's monotonic clock until `freeze()` is called, after which
+it only moves when advanced, either explicitly with `advance_us()` or by
+sleeping. The simulator uses this to run the firmware deterministically.
+
+"""
+
+import time as _time
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+_virtual_us = None
+_epoch = 0
+
+
+def freeze(start_us: int = 0) -> None:
+    """Switch to a virtual clock starting at `start_us`."""
+    global _virtual_us, _epoch
+    _virtual_us = start_us
+    _epoch = int(_time.time())
+
+
+def advance_us(us: int) -> None:
+    """Move the virtual clock forward."""
+    global _virtual_us
+    _virtual_us += us
+
+
+def now_us() -> int:
+    """Return the current time in microseconds, without wrapping."""
+    if _virtual_us is None:
+        return int(_time.monotonic() * 1000000)
+    return _virtual_us
+
+
+def ticks_ms():
+    return (now_us() // 1000) & _TICKS_MAX
+
+
+def ticks_us():
+    return now_us() & _TICKS_MAX
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & _TICKS_MAX
+    return diff - _TICKS_PERIOD if diff >= _TICKS_HALFPERIOD else diff
+
+
+def sleep_ms(ms):
+    sleep_us(ms * 1000)
+
+
+def sleep_us(us):
+    if _virtual_us is None:
+        _time.sleep(us / 1000000)
+    else:
+        advance_us(us)
+
+
+def time():
+    if _virtual_us is None:
+        return int(_time.time())
+    return _epoch + _virtual_us // 1000000
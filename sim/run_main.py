@@ -0,0 +1,163 @@
+"""Run the firmware's main.py on the host against simulated hardware.
+
+Run from the repository root with `python -m sim.run_main [SECONDS]`. The
+unmodified main.py is executed under CPython with the fake MicroPython modules
+on a virtual clock, with a scripted user turning the encoder and pressing the
+button, a WLAN that connects after a short delay, and an in-process MQTT
+broker sending commands. The same script runs the same way every time.
+
+When the time is up, the CPU time taken by each step of every task is reported,
+along with the longest a step kept the virtual clock busy (waiting on a bus),
+and the traffic each emulated chip received and the bus time it took. The
+firmware's own output is hidden unless `--verbose` is given.
+
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import runpy
+import sys
+import tempfile
+
+import sim
+
+sim.install()
+
+import machine
+import uasyncio
+import utime
+
+from sim import chips
+from sim.broker import Broker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BROKER = "broker.sim"
+PREFIX = "sim/digital-audio-switch"
+SETTINGS = {
+    "wifi": {"ssid": "simulated", "password": "simulated"},
+    "mqtt": {"broker": BROKER, "prefix": PREFIX},
+}
+
+ROTARY_CLK = 33
+ROTARY_DT = 32
+BUTTON = 36
+POT_CS = 15
+POT_SPI_HZ = 1000000
+OLED_SCL = 22
+OLED_ADDRESS = 0x3C
+OLED_I2C_HZ = 400000
+SWITCH_A = 18
+SWITCH_B = 19
+SWITCH_INH = 23
+
+# CLK/DT levels for a detent in each direction
+CW = ((1, 0), (0, 0), (0, 1), (1, 1))
+CCW = ((0, 1), (0, 0), (1, 0), (1, 1))
+
+
+async def turn(detents: int, interval_ms: int) -> None:
+    """Turn the encoder, with `interval_ms` between detents."""
+    sequence = CW if detents > 0 else CCW
+    for _ in range(abs(detents)):
+        for clk, dt in sequence:
+            machine.drive(ROTARY_CLK, clk)
+            machine.drive(ROTARY_DT, dt)
+            await uasyncio.sleep_ms(interval_ms // len(sequence))
+
+
+async def click(duration_ms: int = 80) -> None:
+    machine.drive(BUTTON, 1)
+    await uasyncio.sleep_ms(duration_ms)
+    machine.drive(BUTTON, 0)
+
+
+async def double_click() -> None:
+    await click()
+    await uasyncio.sleep_ms(150)
+    await click()
+
+
+async def scenario(broker: Broker) -> None:
+    """What the user and the network do while the firmware runs."""
+    await broker.start()
+    # Give WiFi and MQTT time to connect
+    await uasyncio.sleep_ms(3000)
+    await turn(30, 20)
+    await uasyncio.sleep_ms(1000)
+    await turn(-5, 250)
+    await uasyncio.sleep_ms(1000)
+    await click()
+    await uasyncio.sleep_ms(1000)
+    await double_click()
+    await uasyncio.sleep_ms(1000)
+    broker.publish(f"{PREFIX}/set", '{"volume": {"left": 40, "right": 60}}')
+    await uasyncio.sleep_ms(1000)
+    await click()
+
+
+def report(seconds: float, devices: dict, broker: Broker) -> None:
+    print(f"virtual time: {seconds:.3f} s")
+    print()
+    print(
+        f"{'task':<24} {'steps':>8} {'mean us':>10} {'max us':>10} "
+        f"{'total ms':>10} {'bus max us':>10}"
+    )
+    for stats in sorted(uasyncio.stats().values(), key=lambda s: -s.total_ns):
+        print(
+            f"{stats.name:<24} {stats.steps:>8} "
+            f"{stats.total_ns / stats.steps / 1000:>10.1f} "
+            f"{stats.max_ns / 1000:>10.1f} {stats.total_ns / 1000000:>10.2f} "
+            f"{stats.max_virtual_us:>10}"
+        )
+    print()
+    print(f"{'device':<24} {'transactions':>12} {'bytes':>10} {'bus ms':>10}")
+    for name, device in devices.items():
+        print(
+            f"{name:<24} {device.transactions:>12} {device.bytes:>10} "
+            f"{device.bus_time_us / 1000:>10.2f}"
+        )
+    print(f"{'MQTT':<24} {len(broker.published):>12} {broker.bytes_received:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("seconds", type=float, nargs="?", default=20)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(0)
+    utime.freeze()
+    # Bus transfers take up virtual time, as they would block on the device
+    devices = {
+        "MCP4 (SPI)": chips.MCP4(clock_hz=POT_SPI_HZ, advance_clock=True),
+        "SSD1306 (I2C)": chips.SSD1306(clock_hz=OLED_I2C_HZ, advance_clock=True),
+        "CD4052 (GPIO)": chips.CD4052(SWITCH_A, SWITCH_B, SWITCH_INH),
+    }
+    machine.attach_spi(1, POT_CS, devices["MCP4 (SPI)"])
+    machine.attach_i2c(OLED_SCL, OLED_ADDRESS, devices["SSD1306 (I2C)"])
+    broker = Broker(BROKER)
+    uasyncio.create_task(scenario(broker))
+    uasyncio.set_time_limit_ms(int(args.seconds * 1000))
+
+    output = io.StringIO()
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "settings.json"), "w") as f:
+            json.dump(SETTINGS, f)
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                runpy.run_path(os.path.join(ROOT, "main.py"), run_name="__main__")
+        finally:
+            os.chdir(cwd)
+
+    report(utime.now_us() / 1000000, devices, broker)
+
+
+if __name__ == "__main__":
+    main()
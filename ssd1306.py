@@ -2,6 +2,7 @@
 
 import time
 import framebuf
+import micropython
 
 # register definitions
 SET_CONTRAST        = const(0x81)
@@ -29,6 +30,12 @@ class SSD1306:
         self.height = height
         self.external_vcc = external_vcc
         self.pages = self.height // 8
+        # Copy of what was last sent to the display's GDDRAM, used by show()
+        # to only transfer the columns that changed since the previous flush.
+        self.shadow = bytearray(self.pages * self.width)
+        self.full_refresh = True
+        # Reused for the commands sent before every flush
+        self.window_cmds = bytearray(6)
         # Note the subclass must initialize self.framebuf to a framebuffer.
         # This is necessary because the underlying data buffer is different
         # between I2C and SPI implementations (I2C needs an extra byte).
@@ -36,7 +43,7 @@ class SSD1306:
         self.init_display()
 
     def init_display(self):
-        for cmd in (
+        self.write_cmds(bytes((
             SET_DISP | 0x00, # off
             # address setting
             SET_MEM_ADDR, 0x00, # horizontal
@@ -57,8 +64,7 @@ class SSD1306:
             SET_NORM_INV, # not inverted
             # charge pump
             SET_CHARGE_PUMP, 0x10 if self.external_vcc else 0x14,
-            SET_DISP | 0x01): # on
-            self.write_cmd(cmd)
+            SET_DISP | 0x01))) # on
         self.fill(0)
         self.show()
 
@@ -72,20 +78,132 @@ class SSD1306:
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
-    def show(self):
-        x0 = 0
-        x1 = self.width - 1
+    def show(self, full=False, region=None):
+        # region is an optional (x, y, w, h) rectangle known to contain every
+        # change since the last flush, limiting the comparison to it.
+        if full or self.full_refresh:
+            self.show_window(0, self.width - 1, 0, self.pages - 1)
+            self.shadow[:] = self.framebuf_data
+            self.full_refresh = False
+            return
+        bounds = self.region_window(region)
+        if bounds is None:
+            return
+        window = self.dirty_window(*bounds)
+        if window is None:
+            return
+        x0, x1, p0, p1 = window
+        self.show_window(x0, x1, p0, p1)
+        data = self.framebuf_data
+        shadow = self.shadow
+        for page in range(p0, p1 + 1):
+            start = page * self.width + x0
+            end = page * self.width + x1 + 1
+            shadow[start:end] = data[start:end]
+
+    def show_pages(self, region=None, data=None):
+        # Generator flushing the changes one page at a time, yielding after
+        # each page sent so the caller can get other work done in between.
+        # data is the frame to send, the framebuffer by default.
+        if data is None:
+            data = self.framebuf_data
+        full = self.full_refresh
+        bounds = (0, self.width - 1, 0, self.pages - 1)
+        if not full:
+            bounds = self.region_window(region)
+            if bounds is None:
+                return
+        x0, x1, p0, p1 = bounds
+        shadow = self.shadow
+        for page in range(p0, p1 + 1):
+            window = (x0, x1) if full else self.dirty_window(x0, x1, page, page, data)
+            if window is None:
+                continue
+            start = page * self.width + window[0]
+            end = page * self.width + window[1] + 1
+            self.set_window(window[0], window[1], page, page)
+            self.write_data(data[start:end])
+            shadow[start:end] = data[start:end]
+            yield
+        self.full_refresh = False
+
+    def region_window(self, region):
+        # Convert an (x, y, w, h) region to the (x0, x1, p0, p1) window of
+        # columns and pages covering it on the display, or None if it is
+        # empty or off the display. No region covers the whole display.
+        if region is None:
+            return 0, self.width - 1, 0, self.pages - 1
+        x, y, w, h = region
+        x0 = max(x, 0)
+        x1 = min(x + w, self.width) - 1
+        p0 = max(y, 0) // 8
+        p1 = (min(y + h, self.height) - 1) // 8
+        if x0 > x1 or p0 > p1:
+            return None
+        return x0, x1, p0, p1
+
+    def show_window(self, x0, x1, p0, p1):
+        self.set_window(x0, x1, p0, p1)
+        if x0 == 0 and x1 == self.width - 1 and p0 == 0 and p1 == self.pages - 1:
+            self.write_framebuf()
+            return
+        data = self.framebuf_data
+        for page in range(p0, p1 + 1):
+            start = page * self.width
+            self.write_data(data[start + x0:start + x1 + 1])
+
+    def set_window(self, x0, x1, p0, p1):
         if self.width == 64:
             # displays with width of 64 pixels are shifted by 32
             x0 += 32
             x1 += 32
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_framebuf()
+        cmds = self.window_cmds
+        cmds[0] = SET_COL_ADDR
+        cmds[1] = x0
+        cmds[2] = x1
+        cmds[3] = SET_PAGE_ADDR
+        cmds[4] = p0
+        cmds[5] = p1
+        self.write_cmds(cmds)
+
+    @micropython.native
+    def dirty_window(self, first=0, last=-1, first_page=0, last_page=-1, data=None):
+        # Compare the framebuffer (or another frame) against the shadow copy,
+        # within the given columns and pages (all of them by default),
+        # returning the bounding (x0, x1, p0, p1) window of changed bytes, or
+        # None.
+        if data is None:
+            data = self.framebuf_data
+        shadow = self.shadow
+        width = self.width
+        if last < 0:
+            last = width - 1
+        if last_page < 0:
+            last_page = self.pages - 1
+        x0 = width
+        x1 = -1
+        p0 = -1
+        p1 = -1
+        for page in range(first_page, last_page + 1):
+            base = page * width
+            left = first
+            while left <= last and data[base + left] == shadow[base + left]:
+                left += 1
+            if left > last:
+                continue
+            right = last
+            while data[base + right] == shadow[base + right]:
+                right -= 1
+            if left < x0:
+                x0 = left
+            if right > x1:
+                x1 = right
+            if p0 < 0:
+                p0 = page
+            p1 = page
+        if p0 < 0:
+            return None
+        return x0, x1, p0, p1
 
     def fill(self, col):
         self.framebuf.fill(col)
@@ -112,7 +230,12 @@ class SSD1306_I2C(SSD1306):
         # buffer).
         self.buffer = bytearray(((height // 8) * width) + 1)
         self.buffer[0] = 0x40  # Set first byte of data buffer to Co=0, D/C=1
-        self.framebuf = framebuf.FrameBuffer1(memoryview(self.buffer)[1:], width, height)
+        self.framebuf_data = memoryview(self.buffer)[1:]
+        self.framebuf = framebuf.FrameBuffer1(self.framebuf_data, width, height)
+        self.data_prefix = b"\x40"  # Co=0, D/C#=1
+        # Vector for sending a command stream after its control byte, kept to
+        # avoid allocating a tuple for every batch of commands
+        self.cmds_vector = [b"\x00", None]  # Co=0, D/C#=0
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
@@ -120,11 +243,24 @@ class SSD1306_I2C(SSD1306):
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
 
+    def write_cmds(self, cmds):
+        # Send a sequence of commands in a single I2C transaction, as one
+        # command stream.
+        vector = self.cmds_vector
+        vector[1] = cmds
+        self.i2c.writevto(self.addr, vector)
+        vector[1] = None
+
     def write_framebuf(self):
         # Blast out the frame buffer using a single I2C transaction to support
         # hardware I2C interfaces.
         self.i2c.writeto(self.addr, self.buffer)
 
+    def write_data(self, data):
+        # Send part of the frame buffer in a single I2C transaction, prefixed
+        # with the data control byte without copying it.
+        self.i2c.writevto(self.addr, (self.data_prefix, data))
+
     def poweron(self):
         pass
 
@@ -140,6 +276,7 @@ class SSD1306_SPI(SSD1306):
         self.res = res
         self.cs = cs
         self.buffer = bytearray((height // 8) * width)
+        self.framebuf_data = memoryview(self.buffer)
         self.framebuf = framebuf.FrameBuffer1(self.buffer, width, height)
         super().__init__(width, height, external_vcc)
 
@@ -151,6 +288,14 @@ class SSD1306_SPI(SSD1306):
         self.spi.write(bytearray([cmd]))
         self.cs.high()
 
+    def write_cmds(self, cmds):
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.cs.high()
+        self.dc.low()
+        self.cs.low()
+        self.spi.write(cmds)
+        self.cs.high()
+
     def write_framebuf(self):
         self.spi.init(baudrate=self.rate, polarity=0, phase=0)
         self.cs.high()
@@ -159,6 +304,14 @@ class SSD1306_SPI(SSD1306):
         self.spi.write(self.buffer)
         self.cs.high()
 
+    def write_data(self, data):
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.cs.high()
+        self.dc.high()
+        self.cs.low()
+        self.spi.write(data)
+        self.cs.high()
+
     def poweron(self):
         self.res.high()
         time.sleep_ms(1)
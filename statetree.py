@@ -1,6 +1,18 @@
 class StateTree:
     """A dictionary-like object that tracks when values have been changed."""
 
+    __slots__ = (
+        "_dictionary",
+        "_parent",
+        "_changed",
+        "_children",
+        "_watchers",
+        "_clock",
+        "_version",
+        "_versions",
+        "_cleaned",
+    )
+
     def __init__(self, dictionary: dict = None, parent: "StateTree" = None) -> None:
         """Create a new state tree.
 
@@ -10,29 +22,47 @@ class StateTree:
         If a parent is supplied, the parent will be marked as dirty when this
         tree is modified.
 
+        Every modification of a tree increments a version number shared with
+        its parent and subtrees, which is recorded for the modified key and
+        the trees containing it. This allows consumers to keep track of the
+        version they last saw, and ask what has changed since.
+
         """
         self._dictionary = dictionary if dictionary else dict()
         self._parent = parent
         self._changed = False
+        self._children = dict()
+        self._watchers = None
+        self._clock = parent._clock if parent else [0]
+        self._version = 0
+        self._versions = dict()
+        self._cleaned = self._clock[0]
 
     def dirty(self):
         """Mark the tree as dirty.
 
-        This is done automatically whenever an item is updated.
+        This is done automatically whenever an item is updated. Ancestors of a
+        dirty tree are always dirty as well, so this stops at the first one
+        that already is.
 
         """
-        self._changed = True
-        if self._parent:
-            self._parent.dirty()
+        tree = self
+        while tree is not None and not tree._changed:
+            tree._changed = True
+            tree = tree._parent
 
     def clean(self):
-        """Mark the tree as clean.
+        """Mark the tree and all of its subtrees as clean.
 
         Use this method to reset the changed status of the tree once after
         you've reacted to it being updated.
 
         """
         self._changed = False
+        self._cleaned = self._clock[0]
+        for child in self._children.values():
+            if child._changed:
+                child.clean()
 
     @property
     def changed(self):
@@ -40,6 +70,87 @@ class StateTree:
         marked as clean."""
         return self._changed
 
+    @property
+    def version(self) -> int:
+        """Returns the version of the latest change made to the tree or any of
+        its subtrees."""
+        return self._version
+
+    def watch(self, path, callback) -> None:
+        """Register a callback to be run when a value in the tree changes.
+
+        The path is a key or a tuple of keys leading to the watched value, or
+        an empty tuple to watch the whole tree. The callback is called with
+        the watched value (a StateTree for dictionaries) by `commit()` if it
+        or anything beneath it changed.
+
+        """
+        if not isinstance(path, tuple):
+            path = (path,)
+        if self._watchers is None:
+            self._watchers = []
+        self._watchers.append((path, callback))
+
+    def unwatch(self, path, callback) -> None:
+        """Remove a callback registered with `watch()`."""
+        if not isinstance(path, tuple):
+            path = (path,)
+        self._watchers.remove((path, callback))
+
+    def commit(self) -> None:
+        """Notify watchers of the changes made since the tree was last marked
+        as clean, then mark it as clean.
+
+        Each callback is run at most once per commit, no matter how many
+        values it is watching were changed.
+
+        """
+        if self._changed and self._watchers:
+            changes = self.changes()
+            for path, callback in self._watchers:
+                for change in changes:
+                    length = min(len(path), len(change))
+                    if path[:length] == change[:length]:
+                        value = self
+                        for key in path:
+                            value = value[key]
+                        callback(value)
+                        break
+        self.clean()
+
+    def changes(self, since: int = None) -> list:
+        """Returns the paths of the values changed since the tree was last
+        marked as clean, or since a given version.
+
+        Each path is a tuple of keys, e.g. `("volume", "left")`. If a nested
+        dictionary was replaced, only the path to the dictionary is returned.
+
+        """
+        if since is None:
+            since = self._cleaned
+        paths = []
+        for key, version in self._versions.items():
+            if version > since:
+                paths.append((key,))
+        for key, child in self._children.items():
+            if child._version > since and self._versions.get(key, 0) <= since:
+                paths.extend((key,) + path for path in child.changes(since))
+        return paths
+
+    def delta(self, since: int = None) -> dict:
+        """Returns a dictionary containing only the values changed since the
+        tree was last marked as clean, or since a given version."""
+        if since is None:
+            since = self._cleaned
+        delta = {}
+        for key, version in self._versions.items():
+            if version > since:
+                delta[key] = self._dictionary[key]
+        for key, child in self._children.items():
+            if child._version > since and self._versions.get(key, 0) <= since:
+                delta[key] = child.delta(since)
+        return delta
+
     @property
     def dictionary(self):
         """Returns the underlying dictionary."""
@@ -49,12 +160,18 @@ class StateTree:
         """Get the value stored in a key in the tree.
 
         If the value is a dictionary, returns a StateTree object instead that
-        will notify the parent if a change is made.
+        will notify the parent if a change is made. The same StateTree object
+        is returned for a key until its dictionary is replaced.
 
         """
         o = self._dictionary.__getitem__(*args, **kwargs)
         if isinstance(o, dict):
-            return StateTree(o, parent=self)
+            key = args[0]
+            child = self._children.get(key)
+            if child is None or child._dictionary is not o:
+                child = StateTree(o, parent=self)
+                self._children[key] = child
+            return child
         else:
             return o
 
@@ -66,8 +183,22 @@ class StateTree:
 
         """
         if key not in self._dictionary or value != self._dictionary[key]:
+            self._clock[0] += 1
+            version = self._clock[0]
+            self._versions[key] = version
+            tree = self
+            while tree is not None:
+                tree._version = version
+                tree = tree._parent
             self.dirty()
         self._dictionary[key] = value
+        child = self._children.get(key)
+        if child is not None and child._dictionary is not value:
+            # Changes made within the replaced dictionary are no longer tracked
+            # by its tree, so they are kept as changes to the key
+            if child._version > self._versions.get(key, 0):
+                self._versions[key] = child._version
+            del self._children[key]
 
     def __repr__(self):
         return "<StateTree{}{} {}>".format(
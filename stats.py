@@ -0,0 +1,150 @@
+"""Lightweight timing statistics
+
+Durations are recorded into histograms with a fixed number of power-of-two
+buckets, so recording never allocates memory and can be done anywhere in the
+firmware, including the input path. Each histogram tracks its count, total and
+maximum, and can estimate percentiles from its buckets.
+
+Copyright 2023 Correl Roush
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the “Software”), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so,
+subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+from array import array
+import utime
+
+_ROW = "{:<16} {:>8} {:>8} {:>8} {:>8}"
+
+
+class Histogram:
+    """Distribution of durations in microseconds, or other non-negative counts.
+
+    Bucket 0 counts zero durations, and bucket `n` counts durations from
+    `2**(n-1)` to `2**n - 1`. The last bucket also counts everything longer.
+
+    """
+
+    BUCKETS = 24
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.counts = array("L", [0] * self.BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        """Add a duration to the histogram."""
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        bucket = 0
+        while value and bucket < self.BUCKETS - 1:
+            value >>= 1
+            bucket += 1
+        self.counts[bucket] += 1
+
+    def since(self, start: int) -> None:
+        """Record the time elapsed since a `utime.ticks_us()` value."""
+        self.record(utime.ticks_diff(utime.ticks_us(), start))
+
+    def percentile(self, percent: int) -> int:
+        """Return an upper bound of the given percentile of the durations.
+
+        The bound is the top of the bucket holding the percentile, limited to
+        the maximum duration recorded.
+
+        """
+        if not self.count:
+            return 0
+        # Number of durations at or below the percentile, rounded up
+        rank = (self.count * percent + 99) // 100
+        seen = 0
+        for bucket in range(self.BUCKETS):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                break
+        if bucket == self.BUCKETS - 1:
+            return self.max
+        return min((1 << bucket) - 1, self.max)
+
+    @property
+    def p99(self) -> int:
+        return self.percentile(99)
+
+    @property
+    def mean(self) -> int:
+        return self.total // self.count if self.count else 0
+
+    def reset(self) -> None:
+        for bucket in range(self.BUCKETS):
+            self.counts[bucket] = 0
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p99": self.p99,
+            "max": self.max,
+        }
+
+
+class Stats:
+    """A set of named histograms.
+
+    Histograms should be created up front, when the firmware starts, and kept
+    in variables, so recording durations doesn't need a lookup by name.
+
+    """
+
+    def __init__(self) -> None:
+        self.histograms = []
+
+    def histogram(self, name: str) -> Histogram:
+        """Create a histogram, or return the existing one with this name."""
+        for histogram in self.histograms:
+            if histogram.name == name:
+                return histogram
+        histogram = Histogram(name)
+        self.histograms.append(histogram)
+        return histogram
+
+    def summary(self) -> dict:
+        """Return the summary of every histogram, for publishing as JSON."""
+        return {histogram.name: histogram.summary() for histogram in self.histograms}
+
+    def dump(self) -> None:
+        """Print a table of every histogram, in microseconds."""
+        print(_ROW.format("us", "count", "mean", "p99", "max"))
+        for h in self.histograms:
+            print(_ROW.format(h.name, h.count, h.mean, h.p99, h.max))
+
+    def reset(self) -> None:
+        """Clear every histogram, e.g. to start a new reporting period.
+
+        Resetting regularly also keeps the totals small enough to be stored
+        without allocating.
+
+        """
+        for histogram in self.histograms:
+            histogram.reset()
@@ -1,2 +1,13 @@
 from .test_statetree import *
 from .test_mcp4 import *
+from .test_ssd1306 import *
+from .test_mqtt_async import *
+from .test_button import *
+from .test_rotary import *
+from .test_rotary_pcnt import *
+from .test_stats import *
+from .test_memmon import *
+from .test_wakeup import *
+from .test_display import *
+from .test_widgets import *
+from .test_glyphs import *
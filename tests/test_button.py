@@ -0,0 +1,112 @@
+import unittest
+import utime
+
+from button import Button
+
+
+class FakePin:
+    def __init__(self, value=0):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+    def irq(self, handler=None, trigger=None):
+        self.handler = handler
+
+
+class IRQButtonTests(unittest.TestCase):
+    def setUp(self):
+        self.pin = FakePin()
+        self.button = Button(self.pin, irq=True)
+        # Replay edges relative to a time far enough in the past that every
+        # gesture has timed out by the time update() is called.
+        self.start = utime.ticks_add(utime.ticks_us(), -10_000_000)
+
+    def edge(self, ms, level):
+        self.button._record(utime.ticks_add(self.start, ms * 1000), level)
+
+    def test_click(self):
+        self.edge(0, 1)
+        self.edge(100, 0)
+        self.button.update()
+        self.assertTrue(self.button.was_clicked())
+        self.assertFalse(self.button.was_double_clicked())
+
+    def test_bounces_are_ignored(self):
+        self.edge(0, 1)
+        self.edge(2, 0)
+        self.edge(4, 1)
+        self.edge(100, 0)
+        self.edge(102, 1)
+        self.edge(104, 0)
+        self.button.update()
+        self.assertTrue(self.button.was_clicked())
+        self.assertFalse(self.button.was_double_clicked())
+
+    def test_double_click(self):
+        self.edge(0, 1)
+        self.edge(100, 0)
+        self.edge(200, 1)
+        self.edge(300, 0)
+        self.button.update()
+        self.assertFalse(self.button.was_clicked())
+        self.assertTrue(self.button.was_double_clicked())
+
+    def test_slow_clicks_are_separate(self):
+        self.edge(0, 1)
+        self.edge(100, 0)
+        self.edge(1000, 1)
+        self.edge(1100, 0)
+        self.button.update()
+        self.assertTrue(self.button.was_clicked())
+        self.assertFalse(self.button.was_double_clicked())
+
+    def test_hold(self):
+        self.edge(0, 1)
+        self.button.update()
+        self.assertTrue(self.button.held())
+        self.assertTrue(self.button.pressed())
+
+    def test_full_buffer_drops_edges(self):
+        self.button.update()
+        for i in range(Button.EDGE_BUFFER_SIZE):
+            self.edge(i * 100, i % 2)
+        self.assertEqual(1, self.button.overflows)
+
+
+class NextUpdateTests(unittest.TestCase):
+    def setUp(self):
+        self.pin = FakePin()
+        self.edges = 0
+        self.button = Button(self.pin, irq=True, on_edge=self.on_edge)
+        # Let the initial level settle
+        self.button._update_edges(utime.ticks_add(utime.ticks_us(), 100_000))
+
+    def on_edge(self):
+        self.edges += 1
+
+    def test_edges_are_reported(self):
+        self.pin.value = 1
+        self.button._on_edge(self.pin)
+        self.assertEqual(1, self.edges)
+        self.assertEqual(0, self.button.next_update_ms())
+
+    def test_idle_button_needs_no_updates(self):
+        self.assertIsNone(self.button.next_update_ms())
+
+    def test_bouncing_press_waits_to_settle(self):
+        self.button._record(utime.ticks_us(), 1)
+        self.button.update()
+        self.assertLessEqual(self.button.next_update_ms(), Button.DEBOUNCE_MS)
+
+    def test_press_waits_to_be_held(self):
+        self.button._record(utime.ticks_add(utime.ticks_us(), -60_000), 1)
+        self.button.update()
+        self.assertTrue(self.button.pressed())
+        self.assertGreater(self.button.next_update_ms(), Button.HOLD_MS - 100)
+        self.assertLessEqual(self.button.next_update_ms(), Button.HOLD_MS - 60)
+
+    def test_polled_button_is_polled(self):
+        button = Button(FakePin())
+        self.assertEqual(Button.POLL_MS, button.next_update_ms())
@@ -0,0 +1,118 @@
+"""Tests of the drivers against the simulator's chip emulators.
+
+These need the simulator, so they only run on the host (with `python -m pytest`)
+and aren't part of the on-device suite in `__init__`.
+
+"""
+
+import unittest
+
+import machine
+import sim.chips
+
+import cd4052
+import mcp4
+import ssd1306
+
+
+class MCP4Tests(unittest.TestCase):
+    def setUp(self):
+        machine.reset()
+        self.chip = sim.chips.MCP4(wiper_max=0x80)
+        machine.attach_spi(1, 15, self.chip)
+        self.pot = mcp4.MCP4(machine.SPI(1), machine.Pin(15, machine.Pin.OUT, value=1))
+
+    def test_write_and_read_back(self):
+        self.pot.write(1, 0x33)
+        self.assertEqual([0x40, 0x33], self.chip.wipers)
+        self.assertEqual(0x33, self.pot.read(1, cached=False))
+
+    def test_increment_stops_at_full_scale(self):
+        self.pot.write(0, 0x80)
+        self.pot.increment(0)
+        self.assertEqual(0x80, self.chip.wipers[0])
+
+    def test_write_past_full_scale_is_cached_as_full_scale(self):
+        pot = mcp4.MCP4(
+            machine.SPI(1), machine.Pin(15, machine.Pin.OUT, value=1), wiper_max=0x80
+        )
+        pot.write(0, 1000)
+        pot.write_many((0x200, 0x90))
+        self.assertEqual([0x80, 0x80], self.chip.wipers)
+        self.assertEqual([0x80, 0x80], [pot.read(0), pot.read(1)])
+        self.assertEqual([], pot.verify())
+
+    def test_invalid_command_is_rejected_until_deselected(self):
+        with self.assertRaises(ValueError):
+            self.pot.do(address=0x0A, command=mcp4.MCP4.CMD_READ)
+        self.assertEqual(1, self.chip.errors)
+        self.pot.write(0, 0x10)
+        self.assertEqual(0x10, self.chip.wipers[0])
+
+    def test_commands_after_an_error_are_ignored(self):
+        self.pot._tx[0:3] = bytes([0x50, 0x00, 0x00])
+        output = self.pot._transfer(3)
+        self.assertEqual(b"\xfc\x00\x00", bytes(output))
+        self.assertEqual(0x40, self.chip.wipers[0])
+
+    def test_tcon_and_status(self):
+        self.assertEqual(0x1FF, self.pot.register(mcp4.MCP4.ADDRESS_TCON))
+        self.assertFalse(self.pot.is_shutdown())
+        self.chip.shutdown()
+        self.assertTrue(self.pot.is_shutdown(cached=False))
+
+    def test_burst_write_takes_less_bus_time(self):
+        self.pot.write(0, 10)
+        self.pot.write(1, 10)
+        separate = self.chip.bus_time_us
+        self.chip.reset_counters()
+        self.pot.write_many((20, 20))
+        self.assertEqual(1, self.chip.transactions)
+        self.assertLess(self.chip.bus_time_us, separate)
+
+
+class SSD1306Tests(unittest.TestCase):
+    def setUp(self):
+        machine.reset()
+        self.chip = sim.chips.SSD1306()
+        machine.attach_i2c(22, 0x3C, self.chip)
+        i2c = machine.SoftI2C(scl=machine.Pin(22), sda=machine.Pin(21))
+        self.oled = ssd1306.SSD1306_I2C(128, 32, i2c)
+
+    def test_initialized(self):
+        self.assertTrue(self.chip.on)
+        self.assertEqual(0b00, self.chip.addressing_mode)
+        self.assertEqual(0xFF, self.chip.contrast)
+
+    def test_display_ram_follows_framebuffer(self):
+        self.oled.pixel(5, 3, 1)
+        self.oled.pixel(120, 30, 1)
+        self.oled.show()
+        self.assertEqual(bytes(self.oled.framebuf_data), bytes(self.chip.ram[:512]))
+        self.assertEqual(1, self.chip.pixel(120, 30))
+
+    def test_partial_flush_sends_only_the_window(self):
+        sent = self.chip.data_bytes
+        self.oled.pixel(64, 8, 1)
+        self.oled.show()
+        self.assertEqual(1, self.chip.data_bytes - sent)
+        self.assertEqual(1, self.chip.pixel(64, 8))
+
+
+class CD4052Tests(unittest.TestCase):
+    def setUp(self):
+        machine.reset()
+        self.switch = cd4052.CD4052(18, 19, 23)
+        self.chip = sim.chips.CD4052(18, 19, 23)
+
+    def test_select_switches_while_inhibited(self):
+        self.switch.select(3)
+        self.assertEqual(3, self.chip.channel)
+        self.assertFalse(self.chip.inhibited)
+        # A and B are set one at a time, passing through channel 1
+        self.assertEqual(2, self.chip.switches)
+        self.assertEqual(0, self.chip.unmuted_switches)
+
+    def test_mute(self):
+        self.switch.mute()
+        self.assertTrue(self.chip.inhibited)
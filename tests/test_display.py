@@ -0,0 +1,109 @@
+import unittest
+import uasyncio
+
+from display import Display
+
+
+class FakeOLED:
+    def __init__(self):
+        self.shown = 0
+        self.region = None
+
+    def show(self, region=None):
+        self.shown += 1
+        self.region = region
+
+    def show_pages(self, region=None):
+        for page in range(4):
+            yield
+        self.show(region)
+
+
+class DisplayTests(unittest.TestCase):
+    def setUp(self):
+        self.oled = FakeOLED()
+        self.rendered = 0
+        self.display = Display(self.oled, self.render, fps=10)
+
+    def render(self):
+        self.rendered += 1
+        return (0, 0, self.rendered, 8)
+
+    def run_display(self, scenario):
+        async def run():
+            task = uasyncio.create_task(self.display.run())
+            await scenario()
+            task.cancel()
+
+        uasyncio.run(run())
+
+    def test_draws_requested_frame(self):
+        async def scenario():
+            self.display.request()
+            await uasyncio.sleep_ms(10)
+
+        self.run_display(scenario)
+        self.assertEqual(1, self.rendered)
+        self.assertEqual(1, self.oled.shown)
+        self.assertEqual((0, 0, 1, 8), self.oled.region)
+        self.assertEqual({"frames": 1, "dropped": 0}, self.display.summary())
+        self.assertEqual(1, self.display.render_time.count)
+        self.assertEqual(1, self.display.flush_time.count)
+
+    def test_requests_within_a_frame_are_coalesced(self):
+        async def scenario():
+            for _ in range(5):
+                self.display.request(None)
+                await uasyncio.sleep_ms(1)
+            await uasyncio.sleep_ms(200)
+
+        self.run_display(scenario)
+        # The first request is drawn right away, the rest in the next frame
+        self.assertEqual(2, self.rendered)
+        self.assertEqual({"frames": 2, "dropped": 3}, self.display.summary())
+
+    def test_nothing_is_drawn_without_requests(self):
+        async def scenario():
+            await uasyncio.sleep_ms(200)
+
+        self.run_display(scenario)
+        self.assertEqual(0, self.rendered)
+
+    def test_paged_flush_lets_other_tasks_run(self):
+        self.display = Display(
+            self.oled, self.render, fps=10, flush=Display.FLUSH_PAGED
+        )
+        ran = []
+
+        async def other():
+            while not self.oled.shown:
+                ran.append(self.rendered)
+                await uasyncio.sleep_ms(0)
+
+        async def scenario():
+            uasyncio.create_task(other())
+            await uasyncio.sleep_ms(0)
+            self.display.request()
+            await uasyncio.sleep_ms(10)
+
+        self.run_display(scenario)
+        self.assertEqual(1, self.oled.shown)
+        # Ran while the frame was being sent
+        self.assertGreater(ran.count(1), 1)
+
+    def test_unchanged_frame_is_not_sent(self):
+        self.display = Display(self.oled, lambda: None, fps=10)
+
+        async def scenario():
+            self.display.request()
+            await uasyncio.sleep_ms(10)
+
+        self.run_display(scenario)
+        self.assertEqual(0, self.oled.shown)
+        self.assertEqual(0, self.display.flush_time.count)
+
+    def test_reset(self):
+        self.display.frames = 3
+        self.display.dropped = 2
+        self.display.reset()
+        self.assertEqual({"frames": 0, "dropped": 0}, self.display.summary())
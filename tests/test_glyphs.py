@@ -0,0 +1,64 @@
+import unittest
+import framebuf
+
+from glyphs import FONT, GlyphCache, ScaledFont
+
+
+def screen():
+    buffer = bytearray(128 * 32 // 8)
+    return buffer, framebuf.FrameBuffer(buffer, 128, 32, framebuf.MONO_VLSB)
+
+
+class GlyphCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = GlyphCache(size=2)
+
+    def test_text_matches_builtin_font(self):
+        expected, fb = screen()
+        fb.text("WiFi: OK", 3, 10, 1)
+        actual, fb = screen()
+        self.cache.text(fb, "WiFi: OK", 3, 10)
+        self.assertEqual(expected, actual)
+
+    def test_text_leaves_background(self):
+        expected, fb = screen()
+        fb.fill(1)
+        actual, fb = screen()
+        fb.fill(1)
+        self.cache.text(fb, "MUTE", 0, 0)
+        self.assertEqual(expected, actual)
+
+    def test_tiles_are_reused(self):
+        tile = self.cache.get("L")
+        self.assertIs(tile, self.cache.get("L"))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_strings_share_character_tiles(self):
+        _, fb = screen()
+        self.cache = GlyphCache()
+        self.cache.text(fb, " 42", 0, 0)
+        self.cache.text(fb, "24", 0, 0)
+        self.assertEqual((2, 2), (self.cache.hits, self.cache.misses))
+
+    def test_tiles_are_cached_per_font(self):
+        self.assertIsNot(self.cache.get("1"), self.cache.get("1", ScaledFont(2)))
+
+    def test_first_tile_cached_is_dropped_when_full(self):
+        first = self.cache.get("1")
+        second = self.cache.get("2")
+        self.cache.get("1")
+        self.cache.get("3")
+        self.assertIs(second, self.cache.get("2"))
+        self.assertIsNot(first, self.cache.get("1"))
+        self.assertEqual(4, self.cache.misses)
+
+
+class ScaledFontTests(unittest.TestCase):
+    def test_pixels_are_scaled(self):
+        font = ScaledFont(2)
+        self.assertEqual((16, 16), (font.width, font.height))
+        small = FONT.render("7")
+        large = font.render("7")
+        for y in range(16):
+            for x in range(16):
+                self.assertEqual(small.pixel(x // 2, y // 2), large.pixel(x, y))
@@ -29,3 +29,108 @@ class CommandTests(unittest.TestCase):
             mcp4.command_bytes(0b0000, 0b00, 0b0001111111),
             "0000 00 00 0111 1111",
         )
+
+
+class FakeSPI:
+    """Responds to MCP4 commands from a dictionary of register values."""
+
+    def __init__(self, registers=None):
+        self.registers = registers if registers else {}
+        self.transactions = 0
+
+    def write_readinto(self, data, output):
+        self.transactions += 1
+        offset = 0
+        while offset < len(data):
+            address = data[offset] >> 4
+            command = data[offset] >> 2 & 0b11
+            value = self.registers.get(address, 0)
+            if command == mcp4.MCP4.CMD_WRITE:
+                self.registers[address] = (data[offset] & 0b11) << 8 | data[offset + 1]
+            elif command == mcp4.MCP4.CMD_INCREMENT:
+                self.registers[address] = value + 1
+            elif command == mcp4.MCP4.CMD_DECREMENT:
+                self.registers[address] = value - 1
+            if command == mcp4.MCP4.CMD_READ:
+                output[offset] = 0b11111110 | value >> 8
+            else:
+                output[offset] = 0b11111111
+            if command in (mcp4.MCP4.CMD_WRITE, mcp4.MCP4.CMD_READ):
+                output[offset + 1] = value & 0xFF
+                offset += 1
+            offset += 1
+
+
+class CacheTests(unittest.TestCase):
+    def setUp(self):
+        self.spi = FakeSPI({0: 10, 1: 20})
+        self.pot = mcp4.MCP4(self.spi, lambda value: None, wiper_max=128)
+
+    def test_read_is_cached(self):
+        self.assertEqual(10, self.pot.read(0))
+        self.assertEqual(10, self.pot.read(0))
+        self.assertEqual(1, self.spi.transactions)
+
+    def test_uncached_read(self):
+        self.pot.read(0)
+        self.pot.read(0, cached=False)
+        self.assertEqual(2, self.spi.transactions)
+
+    def test_write_updates_cache(self):
+        self.pot.write(1, 64)
+        self.assertEqual(64, self.pot.read(1))
+        self.assertEqual(1, self.spi.transactions)
+
+    def test_write_past_full_scale_caches_full_scale(self):
+        self.pot.write(0, 1000)
+        self.pot.write_many((200, 300))
+        self.assertEqual(128, self.pot.read(0))
+        self.assertEqual(128, self.pot.read(1))
+
+    def test_increment_and_decrement_update_cache(self):
+        self.pot.write(0, 128)
+        self.pot.increment(0)
+        self.assertEqual(128, self.pot.read(0))
+        self.pot.decrement(0)
+        self.pot.decrement(0)
+        self.assertEqual(126, self.pot.read(0))
+        self.assertEqual(4, self.spi.transactions)
+
+    def test_verify_detects_drift(self):
+        self.pot.read(0)
+        self.pot.read(1)
+        self.spi.registers[1] = 50
+        self.assertEqual([1], self.pot.verify())
+        self.assertEqual(50, self.pot.read(1))
+        self.assertEqual([], self.pot.verify())
+
+
+class BurstTests(unittest.TestCase):
+    def setUp(self):
+        self.spi = FakeSPI()
+        self.pot = mcp4.MCP4(self.spi, lambda value: None)
+
+    def test_write_many_uses_one_transaction(self):
+        self.pot.write_many((10, 0x100))
+        self.assertEqual({0: 10, 1: 0x100}, self.spi.registers)
+        self.assertEqual(1, self.spi.transactions)
+
+    def test_write_many_updates_cache(self):
+        self.pot.write_many((10, 20))
+        self.assertEqual(10, self.pot.read(0))
+        self.assertEqual(20, self.pot.read(1))
+        self.assertEqual(1, self.spi.transactions)
+
+    def test_write_many_checks_every_status_byte(self):
+        def write_readinto(data, output):
+            output[0], output[1], output[2], output[3] = 0xFF, 0xFF, 0x00, 0x00
+
+        self.spi.write_readinto = write_readinto
+        with self.assertRaises(ValueError):
+            self.pot.write_many((10, 20))
+        self.assertEqual(10, self.pot.read(0))
+
+    def test_write_many_rejects_unknown_wipers(self):
+        with self.assertRaises(ValueError):
+            self.pot.write_many((1, 2, 3))
+        self.assertEqual(0, self.spi.transactions)
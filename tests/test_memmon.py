@@ -0,0 +1,45 @@
+import gc
+import unittest
+
+import memmon
+
+
+class MemoryMonitorTests(unittest.TestCase):
+    def test_collect_is_timed(self):
+        memory = memmon.MemoryMonitor()
+        memory.collect()
+        memory.collect()
+        # Probing for the largest free block is cleaned up after with a
+        # second collection
+        expected = 4 if memmon.MEASURABLE else 2
+        self.assertEqual(expected, memory.collections)
+        self.assertEqual(expected, memory.collection_time.count)
+
+    def test_allocations_are_measured(self):
+        if not memmon.MEASURABLE:
+            self.skipTest("gc.mem_alloc() is not available")
+        memory = memmon.MemoryMonitor()
+        memory.collect()
+        memory.mark()
+        buffer = bytearray(1000)
+        memory.measure()
+        self.assertGreaterEqual(memory.allocations.max, len(buffer))
+        self.assertLessEqual(memory.low_water, memory.free())
+
+    def test_summary(self):
+        memory = memmon.MemoryMonitor()
+        summary = memory.summary()
+        self.assertEqual(memory.collections, summary["collections"])
+        self.assertLessEqual(summary["largest_block"], summary["free"])
+        memory.reset()
+        self.assertEqual(0, memory.collections)
+
+    def test_largest_free_block_is_probed_after_collect(self):
+        if not memmon.MEASURABLE:
+            self.skipTest("gc.mem_alloc() is not available")
+        memory = memmon.MemoryMonitor()
+        memory.collect()
+        self.assertGreater(memory.largest_block, 0)
+        self.assertLessEqual(memory.largest_block, memory.PROBE_MAX)
+        self.assertLessEqual(memory.largest_free_block(1000), 1000)
+        self.assertTrue(gc.isenabled())
@@ -0,0 +1,108 @@
+import unittest
+import utime
+
+import mqtt_async
+
+
+class EncodingTests(unittest.TestCase):
+    def test_short_length(self):
+        self.assertEqual(b"\x00", mqtt_async.encode_length(0))
+        self.assertEqual(b"\x7f", mqtt_async.encode_length(127))
+
+    def test_multibyte_length(self):
+        self.assertEqual(b"\x80\x01", mqtt_async.encode_length(128))
+        self.assertEqual(b"\xff\x7f", mqtt_async.encode_length(16383))
+        self.assertEqual(b"\x80\x80\x01", mqtt_async.encode_length(16384))
+
+    def test_string(self):
+        self.assertEqual(b"\x00\x03foo", mqtt_async.encode_string("foo"))
+        self.assertEqual(b"\x00\x03foo", mqtt_async.encode_string(b"foo"))
+
+    def test_connect_packet(self):
+        self.assertEqual(
+            b"\x10\x0f\x00\x04MQTT\x04\x02\x00\x3c\x00\x03abc",
+            mqtt_async.connect_packet(b"abc", 60),
+        )
+
+    def test_connect_packet_with_retained_will(self):
+        data = mqtt_async.connect_packet(b"abc", 60, "s", b"offline", True)
+        self.assertEqual(0b00100110, data[9])
+        self.assertTrue(data.endswith(b"\x00\x01s\x00\x07offline"))
+
+    def test_retained_publish_packet(self):
+        self.assertEqual(
+            b"\x31\x08\x00\x03a/bmsg",
+            mqtt_async.publish_packet("a/b", "msg", retain=True),
+        )
+
+    def test_subscribe_packet(self):
+        self.assertEqual(
+            b"\x82\x08\x00\x01\x00\x03a/b\x00",
+            mqtt_async.subscribe_packet(1, "a/b"),
+        )
+
+
+class BackoffTests(unittest.TestCase):
+    def test_backoff_grows_to_maximum(self):
+        client = mqtt_async.MQTTClient(b"abc", "localhost", backoff_max_ms=8000)
+        for attempts, (low, high) in enumerate(
+            [(500, 1000), (1000, 2000), (2000, 4000), (4000, 8000), (4000, 8000)]
+        ):
+            client._attempts = attempts
+            delay = client.backoff_ms()
+            self.assertTrue(low <= delay <= high, delay)
+
+    def test_full_queue_drops_oldest_message(self):
+        client = mqtt_async.MQTTClient(b"abc", "localhost", queue_size=2)
+        client.connected = True
+        for message in ("1", "2", "3"):
+            client.publish("t", message)
+        self.assertEqual(1, client.dropped)
+        self.assertEqual(
+            [mqtt_async.publish_packet("t", "2"), mqtt_async.publish_packet("t", "3")],
+            client._queue,
+        )
+
+
+class ResolveTests(unittest.TestCase):
+    def test_numeric_address_is_kept(self):
+        client = mqtt_async.MQTTClient(b"abc", "127.0.0.1")
+        self.assertIsNone(client.address)
+        client.resolve()
+        self.assertEqual("127.0.0.1", client.address)
+
+
+class KeepaliveTests(unittest.TestCase):
+    def setUp(self):
+        self.client = mqtt_async.MQTTClient(b"abc", "localhost", keepalive=60)
+        self.now = utime.ticks_ms()
+        self.client._last_sent = self.now
+        self.client._last_received = self.now
+
+    def ago(self, seconds):
+        return utime.ticks_add(self.now, -seconds * 1000)
+
+    def test_ping_is_due_when_nothing_is_sent(self):
+        self.assertFalse(self.client._ping_due())
+        self.client._last_sent = self.ago(30)
+        self.assertTrue(self.client._ping_due())
+
+    def test_ping_is_due_when_nothing_is_received(self):
+        # Publishing regularly doesn't stop the connection from being checked
+        self.client._last_received = self.ago(60)
+        self.assertTrue(self.client._ping_due())
+
+    def test_unanswered_ping_times_out(self):
+        self.client._ping_sent = self.ago(10)
+        self.client._last_received = self.ago(20)
+        self.assertFalse(self.client._ping_due())
+        self.client._ping_sent = self.ago(30)
+        self.client._last_received = self.ago(40)
+        with self.assertRaises(OSError):
+            self.client._ping_due()
+
+    def test_answered_ping_is_cleared(self):
+        self.client._ping_sent = self.ago(40)
+        self.client._last_received = self.ago(39)
+        self.assertFalse(self.client._ping_due())
+        self.assertIsNone(self.client._ping_sent)
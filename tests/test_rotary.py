@@ -0,0 +1,147 @@
+import unittest
+
+import rotary as rotary_module
+from rotary import Rotary
+
+CW = (0b10, 0b00, 0b01, 0b11)
+CCW = (0b01, 0b00, 0b10, 0b11)
+
+
+class FakeRotary(Rotary):
+    """Rotary encoder driven by pin states fed to `turn()`."""
+
+    def __init__(
+        self,
+        min_val=0,
+        max_val=10,
+        incr=1,
+        range_mode=Rotary.RANGE_BOUNDED,
+        accel=None,
+    ):
+        super().__init__(
+            min_val, max_val, incr, False, range_mode, False, False, accel
+        )
+        self._pins = 0b11
+
+    def turn(self, sequence, steps=1):
+        for _ in range(steps):
+            for pins in sequence:
+                self._pins = pins
+                self._process_rotary_pins(None)
+
+    def _hal_get_clk_value(self):
+        return self._pins >> 1
+
+    def _hal_get_dt_value(self):
+        return self._pins & 0b1
+
+    def _hal_enable_irq(self):
+        pass
+
+    def _hal_disable_irq(self):
+        pass
+
+
+class EventTests(unittest.TestCase):
+    def test_steps_are_queued_as_events(self):
+        rotary = FakeRotary()
+        rotary.turn(CW, 2)
+        rotary.turn(CCW)
+        self.assertEqual(1, rotary.value())
+        deltas = []
+        while (event := rotary.read_event()) is not None:
+            deltas.append(event[0])
+        self.assertEqual([1, 1, -1], deltas)
+
+    def test_steps_at_the_bounds_are_not_queued(self):
+        rotary = FakeRotary(max_val=1)
+        rotary.turn(CW, 3)
+        self.assertEqual((1, rotary._event_times[0]), rotary.read_event())
+        self.assertIsNone(rotary.read_event())
+
+    def test_full_event_buffer_counts_overflows(self):
+        rotary = FakeRotary(max_val=100)
+        rotary.turn(CW, 40)
+        self.assertEqual(40, rotary.value())
+        self.assertEqual(9, rotary.overflows()[0])
+
+
+class RangeTests(unittest.TestCase):
+    def test_bounded(self):
+        rotary = FakeRotary(min_val=0, max_val=8, incr=3)
+        rotary.turn(CW, 4)
+        self.assertEqual(8, rotary.value())
+        rotary.turn(CCW, 4)
+        self.assertEqual(0, rotary.value())
+
+    def test_wrap(self):
+        rotary = FakeRotary(
+            min_val=0, max_val=9, incr=4, range_mode=Rotary.RANGE_WRAP
+        )
+        rotary.turn(CW, 3)
+        self.assertEqual(2, rotary.value())
+        rotary.turn(CCW, 1)
+        self.assertEqual(8, rotary.value())
+
+    def test_unbounded(self):
+        rotary = FakeRotary(incr=2, range_mode=Rotary.RANGE_UNBOUNDED)
+        rotary.turn(CCW, 3)
+        self.assertEqual(-6, rotary.value())
+
+    def test_bounces_do_not_step(self):
+        rotary = FakeRotary()
+        rotary.turn((0b10, 0b11, 0b10, 0b00, 0b10, 0b00, 0b01, 0b11))
+        self.assertEqual(1, rotary.value())
+
+
+class FakeClock:
+    """Replaces utime in the rotary module with a manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0
+
+    def ticks_us(self):
+        return self.now
+
+    def ticks_diff(self, a, b):
+        return a - b
+
+
+class AccelerationTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.utime = rotary_module.utime
+        rotary_module.utime = self.clock
+        self.rotary = FakeRotary(
+            max_val=128, accel=((100, 2), (20, 8)), range_mode=Rotary.RANGE_UNBOUNDED
+        )
+
+    def tearDown(self):
+        rotary_module.utime = self.utime
+
+    def turn(self, sequence, interval_ms, steps=1):
+        for _ in range(steps):
+            self.clock.now += interval_ms * 1000
+            self.rotary.turn(sequence)
+
+    def test_slow_turns_step_by_one(self):
+        self.turn(CW, 200, 3)
+        self.assertEqual(3, self.rotary.value())
+
+    def test_fast_turns_are_multiplied(self):
+        self.turn(CW, 200)
+        self.turn(CW, 50, 2)
+        self.turn(CW, 10, 2)
+        self.assertEqual(1 + 2 * 2 + 2 * 8, self.rotary.value())
+
+    def test_change_of_direction_is_not_accelerated(self):
+        self.turn(CW, 200)
+        self.turn(CW, 10)
+        self.turn(CCW, 10)
+        self.assertEqual(8, self.rotary.value())
+
+    def test_events_carry_accelerated_deltas(self):
+        self.turn(CW, 200)
+        self.turn(CW, 10)
+        self.assertEqual((1, 200000), self.rotary.read_event())
+        self.assertEqual((8, 210000), self.rotary.read_event())
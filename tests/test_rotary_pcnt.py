@@ -0,0 +1,83 @@
+import unittest
+
+from rotary import Rotary
+from rotary_pcnt_esp import RotaryPCNT
+
+
+class FakeEncoder:
+    """Stands in for machine.Encoder, counting quadrature edges."""
+
+    def __init__(self):
+        self.count = 0
+        self.closed = False
+
+    def value(self, value=None):
+        if value is not None:
+            self.count = value
+        return self.count
+
+    def deinit(self):
+        self.closed = True
+
+
+class RotaryPCNTTests(unittest.TestCase):
+    def setUp(self):
+        self.encoder = FakeEncoder()
+
+    def rotary(self, **kwargs):
+        return RotaryPCNT(33, 32, counter=self.encoder, **kwargs)
+
+    def test_counts_whole_steps(self):
+        rotary = self.rotary(max_val=100)
+        self.encoder.count = 9
+        self.assertEqual(2, rotary.value())
+        self.encoder.count = 12
+        self.assertEqual(3, rotary.value())
+        self.encoder.count = 5
+        self.assertEqual(2, rotary.value())
+
+    def test_half_step(self):
+        rotary = self.rotary(max_val=100, half_step=True)
+        self.encoder.count = 6
+        self.assertEqual(3, rotary.value())
+
+    def test_increment_and_reverse(self):
+        rotary = self.rotary(max_val=100, incr=4, reverse=True)
+        self.encoder.count = 8
+        self.assertEqual(-8, rotary.value())
+
+    def test_bounded(self):
+        rotary = self.rotary(max_val=10, range_mode=Rotary.RANGE_BOUNDED)
+        self.encoder.count = 4 * 20
+        self.assertEqual(10, rotary.value())
+        self.encoder.count = -4 * 20
+        self.assertEqual(0, rotary.value())
+
+    def test_wrap(self):
+        rotary = self.rotary(max_val=9, range_mode=Rotary.RANGE_WRAP)
+        self.encoder.count = 4 * 12
+        self.assertEqual(2, rotary.value())
+
+    def test_set_discards_counted_steps(self):
+        rotary = self.rotary(max_val=100)
+        self.encoder.count = 8
+        rotary.set(value=50)
+        self.assertEqual(50, rotary.value())
+
+    def test_changes_are_queued_as_events(self):
+        rotary = self.rotary(max_val=100)
+        self.encoder.count = 12
+        delta, _ = rotary.read_event()
+        self.assertEqual(3, delta)
+        self.assertIsNone(rotary.read_event())
+
+    def test_close_releases_the_counter(self):
+        self.rotary().close()
+        self.assertTrue(self.encoder.closed)
+
+    def test_acceleration_uses_average_detent_interval(self):
+        rotary = self.rotary(max_val=100, accel=((50, 4),))
+        self.encoder.count = 4
+        self.assertEqual(1, rotary.value())
+        self.encoder.count = 12
+        self.assertEqual(9, rotary.value())
@@ -0,0 +1,147 @@
+import unittest
+
+import ssd1306
+
+
+class FakeI2C:
+    def __init__(self):
+        self.transactions = []
+
+    def writeto(self, addr, buf):
+        self.transactions.append(bytes(buf))
+
+    def writevto(self, addr, vector):
+        self.transactions.append(b"".join(bytes(buf) for buf in vector))
+
+    def commands(self):
+        # Single commands (Co=1) and command streams (Co=0)
+        commands = []
+        for t in self.transactions:
+            if t[0] == 0x80:
+                commands.append(t[1])
+            elif t[0] == 0x00:
+                commands.extend(t[1:])
+        return commands
+
+    def data(self):
+        return [t[1:] for t in self.transactions if t[0] == 0x40]
+
+
+class CommandStreamTests(unittest.TestCase):
+    def setUp(self):
+        self.i2c = FakeI2C()
+
+    def test_init_sends_one_command_stream(self):
+        ssd1306.SSD1306_I2C(128, 32, self.i2c)
+        init = self.i2c.transactions[0]
+        self.assertEqual(0x00, init[0])
+        self.assertEqual(ssd1306.SET_DISP, init[1])
+        self.assertEqual(ssd1306.SET_DISP | 0x01, init[-1])
+        self.assertEqual(26, len(init))
+        # Followed by the window and the cleared framebuffer
+        self.assertEqual(3, len(self.i2c.transactions))
+
+    def test_window_is_one_transaction(self):
+        oled = ssd1306.SSD1306_I2C(128, 32, self.i2c)
+        self.i2c.transactions.clear()
+        oled.pixel(100, 10, 1)
+        oled.show()
+        self.assertEqual(
+            [b"\x00\x21\x64\x64\x22\x01\x01", b"\x40\x04"],
+            self.i2c.transactions,
+        )
+
+    def test_single_command(self):
+        oled = ssd1306.SSD1306_I2C(128, 32, self.i2c)
+        self.i2c.transactions.clear()
+        oled.invert(1)
+        self.assertEqual([b"\x80\xa7"], self.i2c.transactions)
+
+
+class PartialFlushTests(unittest.TestCase):
+    def setUp(self):
+        self.i2c = FakeI2C()
+        self.oled = ssd1306.SSD1306_I2C(128, 32, self.i2c)
+        self.i2c.transactions.clear()
+
+    def test_unchanged_framebuffer_sends_nothing(self):
+        self.oled.show()
+        self.assertEqual([], self.i2c.transactions)
+
+    def test_changed_column_sends_only_its_window(self):
+        self.oled.pixel(100, 10, 1)
+        self.oled.show()
+        self.assertEqual(
+            [
+                ssd1306.SET_COL_ADDR, 100, 100,
+                ssd1306.SET_PAGE_ADDR, 1, 1,
+            ],
+            self.i2c.commands(),
+        )
+        self.assertEqual([bytes([0b00000100])], self.i2c.data())
+
+    def test_window_spans_changed_pages(self):
+        self.oled.pixel(3, 0, 1)
+        self.oled.pixel(9, 20, 1)
+        self.oled.show()
+        self.assertEqual(
+            [
+                ssd1306.SET_COL_ADDR, 3, 9,
+                ssd1306.SET_PAGE_ADDR, 0, 2,
+            ],
+            self.i2c.commands(),
+        )
+        self.assertEqual([7, 7, 7], [len(data) for data in self.i2c.data()])
+
+    def test_flushed_changes_are_not_resent(self):
+        self.oled.pixel(0, 0, 1)
+        self.oled.show()
+        self.i2c.transactions.clear()
+        self.oled.show()
+        self.assertEqual([], self.i2c.transactions)
+
+    def test_full_refresh_sends_whole_framebuffer(self):
+        self.oled.show(full=True)
+        self.assertEqual([513], [len(t) for t in self.i2c.transactions[1:]])
+
+    def test_region_limits_comparison(self):
+        self.oled.pixel(3, 0, 1)
+        self.oled.pixel(100, 10, 1)
+        self.oled.show(region=(96, 8, 8, 8))
+        self.assertEqual(
+            [
+                ssd1306.SET_COL_ADDR, 100, 100,
+                ssd1306.SET_PAGE_ADDR, 1, 1,
+            ],
+            self.i2c.commands(),
+        )
+
+    def test_region_outside_display_sends_nothing(self):
+        self.oled.pixel(0, 0, 1)
+        self.oled.show(region=(128, 0, 8, 8))
+        self.assertEqual([], self.i2c.transactions)
+
+    def test_show_pages_sends_one_page_at_a_time(self):
+        self.oled.pixel(3, 0, 1)
+        self.oled.pixel(9, 20, 1)
+        pages = self.oled.show_pages()
+        next(pages)
+        self.assertEqual(
+            [ssd1306.SET_COL_ADDR, 3, 3, ssd1306.SET_PAGE_ADDR, 0, 0],
+            self.i2c.commands(),
+        )
+        self.assertEqual(1, len(list(pages)))
+        self.assertEqual([b"\x01", b"\x10"], self.i2c.data())
+        self.i2c.transactions.clear()
+        self.oled.show()
+        self.assertEqual([], self.i2c.transactions)
+
+    def test_show_pages_from_another_frame(self):
+        frame = bytearray(len(self.oled.shadow))
+        frame[130] = 0xFF
+        list(self.oled.show_pages(region=(0, 8, 8, 8), data=frame))
+        self.assertEqual(
+            [ssd1306.SET_COL_ADDR, 2, 2, ssd1306.SET_PAGE_ADDR, 1, 1],
+            self.i2c.commands(),
+        )
+        self.assertEqual([b"\xff"], self.i2c.data())
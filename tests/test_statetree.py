@@ -36,3 +36,142 @@ class StateTreeTests(unittest.TestCase):
         tree.dirty()
         tree.clean()
         self.assertFalse(tree.changed)
+
+    def test_nested_trees_are_reused(self):
+        tree = StateTree({"foo": {"bar": "baz"}})
+        self.assertIs(tree["foo"], tree["foo"])
+
+    def test_replacing_a_nested_dictionary_replaces_its_tree(self):
+        tree = StateTree({"foo": {"bar": "baz"}})
+        child = tree["foo"]
+        tree["foo"] = {"bar": "changed"}
+        self.assertIsNot(child, tree["foo"])
+        self.assertEqual("changed", tree["foo"]["bar"])
+
+    def test_cleaning_cleans_nested_trees(self):
+        tree = StateTree({"foo": {"bar": "baz"}})
+        tree["foo"]["bar"] = "changed"
+        tree.clean()
+        self.assertFalse(tree["foo"].changed)
+        tree["foo"]["bar"] = "changed again"
+        self.assertTrue(tree.changed)
+
+    def test_clean_tree_has_no_changes(self):
+        tree = StateTree({"foo": {"bar": "baz"}})
+        tree["foo"]["bar"] = "baz"
+        self.assertEqual([], tree.changes())
+        self.assertEqual({}, tree.delta())
+
+    def test_changes_lists_changed_paths(self):
+        tree = StateTree({"foo": {"bar": "baz", "qux": 1}, "quux": 2})
+        tree["foo"]["bar"] = "changed"
+        tree["quux"] = 3
+        self.assertEqual(
+            sorted([("foo", "bar"), ("quux",)]), sorted(tree.changes())
+        )
+        self.assertEqual({"foo": {"bar": "changed"}, "quux": 3}, tree.delta())
+
+    def test_replaced_dictionary_is_a_single_change(self):
+        tree = StateTree({"foo": {"bar": "baz"}})
+        tree["foo"] = {"bar": "changed"}
+        tree["foo"]["bar"] = "changed again"
+        self.assertEqual([("foo",)], tree.changes())
+        self.assertEqual({"foo": {"bar": "changed again"}}, tree.delta())
+
+    def test_cleaning_forgets_changes(self):
+        tree = StateTree({"foo": {"bar": "baz"}})
+        tree["foo"]["bar"] = "changed"
+        tree.clean()
+        self.assertEqual([], tree.changes())
+        self.assertEqual({}, tree.delta())
+
+    def test_commit_notifies_watchers_once(self):
+        tree = StateTree({"foo": {"bar": "baz", "qux": 1}})
+        calls = []
+        tree.watch("foo", calls.append)
+        tree["foo"]["bar"] = "changed"
+        tree["foo"]["qux"] = 2
+        tree.commit()
+        self.assertEqual([tree["foo"]], calls)
+        self.assertFalse(tree.changed)
+
+    def test_commit_only_notifies_matching_watchers(self):
+        tree = StateTree({"foo": {"bar": "baz"}, "qux": 1})
+        calls = []
+        tree.watch(("foo", "bar"), lambda value: calls.append(("bar", value)))
+        tree.watch("qux", lambda value: calls.append(("qux", value)))
+        tree.watch((), lambda value: calls.append(("all", value)))
+        tree["qux"] = 2
+        tree.commit()
+        self.assertEqual([("qux", 2), ("all", tree)], calls)
+
+    def test_replacing_a_parent_notifies_nested_watchers(self):
+        tree = StateTree({"foo": {"bar": "baz"}})
+        calls = []
+        tree.watch(("foo", "bar"), calls.append)
+        tree["foo"] = {"bar": "changed"}
+        tree.commit()
+        self.assertEqual(["changed"], calls)
+
+    def test_clean_commit_does_not_notify_watchers(self):
+        tree = StateTree({"foo": "bar"})
+        calls = []
+        tree.watch("foo", calls.append)
+        tree["foo"] = "bar"
+        tree.commit()
+        self.assertEqual([], calls)
+
+    def test_unwatched_callbacks_are_not_notified(self):
+        tree = StateTree({"foo": "bar"})
+        calls = []
+
+        def callback(value):
+            calls.append(value)
+
+        tree.watch("foo", callback)
+        tree.unwatch("foo", callback)
+        tree["foo"] = "baz"
+        tree.commit()
+        self.assertEqual([], calls)
+
+    def test_changes_increment_version(self):
+        tree = StateTree({"foo": {"bar": "baz"}, "qux": 1})
+        self.assertEqual(0, tree.version)
+        tree["foo"]["bar"] = "changed"
+        self.assertEqual(1, tree.version)
+        self.assertEqual(1, tree["foo"].version)
+        tree["qux"] = 2
+        self.assertEqual(2, tree.version)
+        self.assertEqual(1, tree["foo"].version)
+
+    def test_unchanged_values_keep_version(self):
+        tree = StateTree({"foo": "bar"})
+        tree["foo"] = "bar"
+        self.assertEqual(0, tree.version)
+
+    def test_changes_since_version(self):
+        tree = StateTree({"foo": {"bar": "baz"}, "qux": 1})
+        tree["foo"]["bar"] = "changed"
+        version = tree.version
+        tree["qux"] = 2
+        self.assertEqual([("qux",)], tree.changes(since=version))
+        self.assertEqual({"qux": 2}, tree.delta(since=version))
+        self.assertEqual(
+            sorted([("foo", "bar"), ("qux",)]), sorted(tree.changes(since=0))
+        )
+
+    def test_replacing_with_equal_dictionary_keeps_changes(self):
+        tree = StateTree({"foo": {"bar": "baz"}})
+        tree["foo"]["bar"] = "changed"
+        tree["foo"] = {"bar": "changed"}
+        self.assertEqual(1, tree.version)
+        self.assertEqual([("foo",)], tree.changes(since=0))
+        self.assertEqual({"foo": {"bar": "changed"}}, tree.delta(since=0))
+        self.assertEqual([], tree.changes(since=1))
+
+    def test_cleaning_does_not_affect_versions(self):
+        tree = StateTree({"foo": {"bar": "baz"}})
+        tree["foo"]["bar"] = "changed"
+        tree.clean()
+        self.assertEqual([], tree.changes())
+        self.assertEqual({"foo": {"bar": "changed"}}, tree.delta(since=0))
@@ -0,0 +1,43 @@
+import unittest
+
+from stats import Histogram, Stats
+
+
+class HistogramTests(unittest.TestCase):
+    def test_buckets(self):
+        histogram = Histogram("test")
+        for value in (0, 1, 2, 3, 4, 1000):
+            histogram.record(value)
+        self.assertEqual([1, 1, 2, 1], list(histogram.counts[:4]))
+        self.assertEqual(1, histogram.counts[10])
+
+    def test_long_durations_go_in_the_last_bucket(self):
+        histogram = Histogram("test")
+        histogram.record(1 << 30)
+        self.assertEqual(1, histogram.counts[Histogram.BUCKETS - 1])
+        self.assertEqual(1 << 30, histogram.p99)
+
+    def test_summary(self):
+        histogram = Histogram("test")
+        for _ in range(99):
+            histogram.record(10)
+        histogram.record(5000)
+        self.assertEqual(
+            {"count": 100, "mean": 59, "p99": 15, "max": 5000}, histogram.summary()
+        )
+        histogram.record(5000)
+        self.assertEqual(5000, histogram.p99)
+
+    def test_reset(self):
+        histogram = Histogram("test")
+        histogram.record(10)
+        histogram.reset()
+        self.assertEqual({"count": 0, "mean": 0, "p99": 0, "max": 0}, histogram.summary())
+
+
+class StatsTests(unittest.TestCase):
+    def test_histograms_are_created_once(self):
+        stats = Stats()
+        self.assertIs(stats.histogram("input"), stats.histogram("input"))
+        stats.histogram("input").record(3)
+        self.assertEqual(["input"], list(stats.summary().keys()))
@@ -0,0 +1,35 @@
+import unittest
+import uasyncio
+
+from stats import Histogram
+from wakeup import Wakeup
+
+
+class WakeupTests(unittest.TestCase):
+    def test_set_wakes_waiter(self):
+        wakeup = Wakeup()
+
+        async def wake_later():
+            await uasyncio.sleep_ms(5)
+            wakeup.set()
+
+        async def run():
+            uasyncio.create_task(wake_later())
+            await wakeup.wait()
+            return True
+
+        self.assertTrue(uasyncio.run(run()))
+
+    def test_wait_times_out(self):
+        wakeup = Wakeup()
+        uasyncio.run(wakeup.wait(5))
+
+    def test_latency_is_recorded_once_per_wakeup(self):
+        latency = Histogram("wake")
+        wakeup = Wakeup(latency)
+        wakeup.set()
+        wakeup.set(None)
+        uasyncio.run(wakeup.wait())
+        wakeup.handled()
+        wakeup.handled()
+        self.assertEqual(1, latency.count)
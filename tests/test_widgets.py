@@ -0,0 +1,106 @@
+import unittest
+import framebuf
+
+import glyphs
+from widgets import Bar, Box, Label, Number, Screen
+
+
+class FakeFrameBuffer:
+    def __init__(self):
+        self.calls = []
+
+    def fill_rect(self, x, y, w, h, c):
+        self.calls.append(("fill_rect", x, y, w, h, c))
+
+    def rect(self, x, y, w, h, c):
+        self.calls.append(("rect", x, y, w, h, c))
+
+    def blit(self, tile, x, y, key):
+        self.calls.append(("blit", tile, x, y))
+
+
+def text(s, x, y):
+    """The blits drawing a string, one for each character but spaces."""
+    return [
+        ("blit", glyphs.cache.get(char), x + i * 8, y)
+        for i, char in enumerate(s)
+        if char != " "
+    ]
+
+
+class ScreenTests(unittest.TestCase):
+    def setUp(self):
+        self.fb = FakeFrameBuffer()
+        self.bar = Bar(10, 0, 92, 8, 128)
+        self.number = Number(104, 0, 3)
+        self.label = Label(80, 20, 6, "DAC", align=">")
+        self.box = Box(38, 2, 38, 14, "MUTE")
+        self.screen = Screen(self.bar, self.number, self.label, self.box)
+        self.screen.draw(self.fb)
+        self.fb.calls.clear()
+
+    def test_first_draw_covers_every_widget(self):
+        self.screen.invalidate()
+        self.assertEqual((10, 0, 118, 28), self.screen.draw(self.fb))
+
+    def test_unchanged_values_draw_nothing(self):
+        self.number.set(0)
+        self.label.set("DAC")
+        self.assertIsNone(self.screen.draw(self.fb))
+        self.assertEqual([], self.fb.calls)
+
+    def test_changed_widget_redraws_its_rectangle(self):
+        self.number.set(42)
+        self.assertEqual((104, 0, 24, 8), self.screen.draw(self.fb))
+        self.assertEqual(
+            [("fill_rect", 104, 0, 24, 8, 0)] + text(" 42", 104, 0),
+            self.fb.calls,
+        )
+
+    def test_label_alignment(self):
+        self.label.set("PHONO")
+        self.screen.draw(self.fb)
+        self.assertEqual(text(" PHONO", 80, 20), self.fb.calls[-5:])
+
+    def test_bar_redraws_only_when_its_fill_changes(self):
+        self.bar.set(1)
+        self.screen.draw(self.fb)
+        self.bar.set(2)
+        self.assertIsNone(self.screen.draw(self.fb))
+        self.bar.set(64)
+        self.assertEqual((10, 0, 92, 8), self.screen.draw(self.fb))
+        self.assertIn(("fill_rect", 12, 2, 44, 4, 1), self.fb.calls)
+
+    def test_shown_box_is_redrawn_over_changed_widget(self):
+        self.box.set(True)
+        self.screen.draw(self.fb)
+        self.fb.calls.clear()
+        self.bar.set(64)
+        self.assertEqual((10, 0, 92, 16), self.screen.draw(self.fb))
+        self.assertEqual(text("MUTE", 41, 5), self.fb.calls[-4:])
+
+    def test_hiding_box_redraws_widgets_beneath(self):
+        self.box.set(True)
+        self.screen.draw(self.fb)
+        self.box.set(False)
+        self.assertEqual((10, 0, 92, 16), self.screen.draw(self.fb))
+
+
+class RenderTests(unittest.TestCase):
+    def test_partial_redraw_matches_full_redraw(self):
+        buffers = [bytearray(128 * 32 // 8) for _ in range(2)]
+        fbs = [framebuf.FrameBuffer(b, 128, 32, framebuf.MONO_VLSB) for b in buffers]
+        screens = []
+        for fb in fbs:
+            bar = Bar(10, 0, 92, 8, 128)
+            box = Box(38, 2, 38, 14, "MUTE")
+            screens.append((Screen(bar, Number(104, 0, 3), box), bar, box))
+        for value, muted in ((100, True), (20, True), (20, False), (128, False)):
+            for i, (screen, bar, box) in enumerate(screens):
+                bar.set(value)
+                box.set(muted)
+                if i == 1:
+                    fbs[i].fill(0)
+                    screen.invalidate()
+                screen.draw(fbs[i])
+            self.assertEqual(buffers[1], buffers[0])
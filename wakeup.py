@@ -0,0 +1,75 @@
+"""Interrupt-driven task wakeup
+
+A `Wakeup` lets a uasyncio task sleep until an interrupt handler (or anything
+else) signals that there is work to do, instead of polling. It records the
+time of the first signal, so the latency between the interrupt and the task
+handling it can be measured.
+
+Copyright 2023 Correl Roush
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the “Software”), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so,
+subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import uasyncio
+import utime
+
+from stats import Histogram
+
+
+class Wakeup:
+    def __init__(self, latency: Histogram = None) -> None:
+        """Create a new wakeup.
+
+        If a histogram is given, the time from each first `set()` to the
+        following `handled()` is recorded into it, in microseconds.
+
+        """
+        self.latency = latency
+        self._flag = uasyncio.ThreadSafeFlag()
+        self._pending = False
+        self._time = 0
+
+    def set(self, *args) -> None:
+        """Wake the waiting task.
+
+        Safe to call from an interrupt handler, and accepts and ignores any
+        arguments so it can be used directly as a callback.
+
+        """
+        if not self._pending:
+            self._time = utime.ticks_us()
+            self._pending = True
+        self._flag.set()
+
+    async def wait(self, timeout_ms: int = None) -> None:
+        """Wait until woken, or until `timeout_ms` has passed if it is set."""
+        if timeout_ms is None:
+            await self._flag.wait()
+            return
+        try:
+            await uasyncio.wait_for_ms(self._flag.wait(), timeout_ms)
+        except uasyncio.TimeoutError:
+            pass
+
+    def handled(self) -> None:
+        """Mark the work signalled since the last call as done."""
+        if self._pending:
+            self._pending = False
+            if self.latency is not None:
+                self.latency.since(self._time)
@@ -0,0 +1,214 @@
+"""Retained-mode display widgets
+
+Widgets remember the value they last drew, and a `Screen` only redraws the
+widgets whose values changed, along with any widgets overlapping them. Drawing
+a screen returns the region of the framebuffer that was redrawn, so only that
+region needs to be compared and sent to the display.
+
+Widgets are drawn in the order they were added to the screen, later widgets
+on top of earlier ones.
+
+Copyright 2023 Correl Roush
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the “Software”), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so,
+subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""
+
+import glyphs
+from glyphs import FONT, Font
+
+
+class Widget:
+    """A rectangular area of the screen showing a value."""
+
+    def __init__(self, x: int, y: int, width: int, height: int, value=None) -> None:
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.value = value
+        self.dirty = True
+
+    def set(self, value) -> None:
+        """Change the value shown, marking the widget for redrawing if it
+        differs from the value last set."""
+        if value != self.value:
+            self.value = value
+            self.dirty = True
+
+    def overlaps(self, x0: int, y0: int, x1: int, y1: int) -> bool:
+        """Return whether the widget overlaps the region from (x0, y0) up to,
+        but not including, (x1, y1)."""
+        return (
+            self.x < x1
+            and x0 < self.x + self.width
+            and self.y < y1
+            and y0 < self.y + self.height
+        )
+
+    @property
+    def visible(self) -> bool:
+        """Whether the widget has anything drawn on the screen."""
+        return True
+
+    def clear(self, fb) -> None:
+        fb.fill_rect(self.x, self.y, self.width, self.height, 0)
+
+    def render(self, fb) -> None:
+        """Draw the widget within its rectangle, over any widgets beneath."""
+        raise NotImplementedError
+
+
+class Label(Widget):
+    """Text of up to `chars` characters, aligned with a format specification
+    (e.g. ">" to right-align)."""
+
+    def __init__(
+        self,
+        x: int,
+        y: int,
+        chars: int,
+        text: str = "",
+        align: str = "<",
+        font: Font = FONT,
+    ) -> None:
+        super().__init__(x, y, chars * font.width, font.height, text)
+        self.format = "{:" + align + str(chars) + "}"
+        self.font = font
+
+    def render(self, fb) -> None:
+        text = self.format.format(self.value)
+        glyphs.cache.text(fb, text, self.x, self.y, self.font)
+
+
+class Number(Label):
+    """A right-aligned integer."""
+
+    def __init__(
+        self, x: int, y: int, digits: int, value: int = 0, font: Font = FONT
+    ) -> None:
+        super().__init__(x, y, digits, value, ">", font)
+        self.format = "{:" + str(digits) + "d}"
+
+
+class Bar(Widget):
+    """An outlined horizontal bar filled in proportion to a value.
+
+    The value is kept as the filled width in pixels, so changes too small to
+    show don't cause a redraw.
+
+    """
+
+    def __init__(
+        self, x: int, y: int, width: int, height: int, maximum: int, padding: int = 2
+    ) -> None:
+        super().__init__(x, y, width, height, 0)
+        self.maximum = maximum
+        self.padding = padding
+
+    def set(self, value: int) -> None:
+        inner = self.width - 2 * self.padding
+        super().set(round(min(max(value, 0), self.maximum) / self.maximum * inner))
+
+    def render(self, fb) -> None:
+        fb.rect(self.x, self.y, self.width, self.height, 1)
+        if self.value:
+            fb.fill_rect(
+                self.x + self.padding,
+                self.y + self.padding,
+                self.value,
+                self.height - 2 * self.padding,
+                1,
+            )
+
+
+class Box(Widget):
+    """An outlined box of text overlaying the widgets beneath it, shown while
+    its value is true."""
+
+    def __init__(self, x: int, y: int, width: int, height: int, text: str) -> None:
+        super().__init__(x, y, width, height, False)
+        self.text = text
+
+    @property
+    def visible(self) -> bool:
+        return bool(self.value)
+
+    def render(self, fb) -> None:
+        if not self.value:
+            return
+        # Hide the widgets beneath, leaving a blank margin around the outline
+        fb.fill_rect(self.x, self.y, self.width, self.height, 0)
+        fb.rect(self.x + 1, self.y + 1, self.width - 2, self.height - 2, 1)
+        glyphs.cache.text(fb, self.text, self.x + 3, self.y + 3)
+
+
+class Screen:
+    def __init__(self, *widgets: Widget) -> None:
+        self.widgets = list(widgets)
+
+    def add(self, widget: Widget) -> Widget:
+        """Add a widget on top of the others, returning it."""
+        self.widgets.append(widget)
+        return widget
+
+    def invalidate(self) -> None:
+        """Mark every widget for redrawing, e.g. after the framebuffer was
+        cleared."""
+        for widget in self.widgets:
+            widget.dirty = True
+
+    def draw(self, fb):
+        """Redraw the widgets that changed, and those overlapping them.
+
+        Returns the redrawn region as an (x, y, width, height) tuple, or None if
+        nothing was redrawn.
+
+        """
+        widgets = self.widgets
+        # Redraw every visible widget overlapping one being redrawn, as it will
+        # be partly erased, until there are no more
+        grown = True
+        while grown:
+            grown = False
+            for widget in widgets:
+                if widget.dirty or not widget.visible:
+                    continue
+                for other in widgets:
+                    if other.dirty and widget.overlaps(
+                        other.x, other.y, other.x + other.width, other.y + other.height
+                    ):
+                        widget.dirty = grown = True
+                        break
+        x0 = y0 = 0x7FFF
+        x1 = y1 = -1
+        # Clear everything first, so clearing a widget can't erase one above it
+        for widget in widgets:
+            if widget.dirty:
+                widget.clear(fb)
+                x0 = min(x0, widget.x)
+                y0 = min(y0, widget.y)
+                x1 = max(x1, widget.x + widget.width)
+                y1 = max(y1, widget.y + widget.height)
+        if x1 < 0:
+            return None
+        for widget in widgets:
+            if widget.dirty:
+                widget.render(fb)
+                widget.dirty = False
+        return x0, y0, x1 - x0, y1 - y0